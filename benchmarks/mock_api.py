@@ -0,0 +1,346 @@
+"""
+Local stand-in for the GitHub REST API and the Anthropic Messages API.
+
+GitHub routes serve synthetic data with real pagination (page/per_page, Link headers),
+rate-limit headers and ETag/If-None-Match on repo listings, repos and PRs. The Messages API answers
+plainly or as a server-sent event stream when the request sets "stream": true.
+Both inject a configurable latency per request.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+USERNAME = "bench"
+ORG = "bench-org"
+RATE_LIMIT = 5000
+
+
+@dataclass
+class MockConfig:
+    github_latency: float = 0.0
+    anthropic_latency: float = 0.0
+    stream_chunk_latency: float = 0.0
+    events: int = 200
+    repos: int = 50
+    active_repos: int = 10
+    commits_per_repo: int = 30
+    response_words: int = 60
+    days: int = 7
+
+
+def etag(payload: object) -> str:
+    return f'"{hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()}"'
+
+
+def iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MockData:
+    def __init__(self, config: MockConfig):
+        now = datetime.now(UTC).replace(microsecond=0)
+        span = timedelta(days=config.days)
+
+        # the first active_repos are pushed within the window, the rest long before it
+        self.repos = [
+            {
+                "full_name": f"{ORG}/service-{i}",
+                "pushed_at": iso(now - span * i / config.active_repos if i < config.active_repos else now - span * 4),
+                "archived": False,
+                "size": 1000 + i,
+            }
+            for i in range(config.repos)
+        ]
+        self.commits: dict[str, list[dict]] = {}
+        for repo in self.repos[: config.active_repos]:
+            self.commits[repo["full_name"]] = [
+                {
+                    "sha": hashlib.sha1(f"{repo['full_name']}:{i}".encode()).hexdigest(),
+                    "commit": {
+                        "message": f"Change {i} in {repo['full_name']}\n\nDetails.",
+                        "author": {"name": USERNAME, "date": iso(now - span * i / config.commits_per_repo)},
+                    },
+                }
+                for i in range(config.commits_per_repo)
+            ]
+
+        # push events repeat some listed commits, as the real API does
+        self.events = []
+        listed = [commit for commits in self.commits.values() for commit in commits]
+        for i in range(config.events):
+            created_at = iso(now - span * i / config.events)
+            event_id = str(10_000_000 + config.events - i)
+            repo = self.repos[i % max(config.active_repos, 1)]["full_name"]
+            if i % 3 == 0 and listed:
+                commit = listed[i % len(listed)]
+                payload = {"commits": [{"sha": commit["sha"], "message": commit["commit"]["message"]}]}
+                event_type = "PushEvent"
+            elif i % 3 == 1:
+                payload = {"action": "opened", "pull_request": {"title": f"Feature {i}"}}
+                event_type = "PullRequestEvent"
+            else:
+                payload = {"action": "created", "issue": {"title": f"Issue {i}"}}
+                event_type = "IssueCommentEvent"
+            self.events.append(
+                {
+                    "id": event_id,
+                    "type": event_type,
+                    "repo": {"name": repo},
+                    "created_at": created_at,
+                    "payload": payload,
+                }
+            )
+
+        self.repos_etag = f'"{hashlib.sha1(json.dumps(self.repos).encode()).hexdigest()}"'
+        self.pulls: dict[str, list[dict]] = {}
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.config = config
+        self.data = MockData(config)
+        self.counts: Counter[str] = Counter()
+        self.rate_remaining = RATE_LIMIT
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str) -> None:
+        with self.lock:
+            self.counts[route] += 1
+
+    def reset_counts(self) -> None:
+        with self.lock:
+            self.counts.clear()
+
+    def start(self) -> "MockAPIServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server: MockAPIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_github("GET")
+
+    def do_PATCH(self) -> None:
+        self.handle_github("PATCH")
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path == "/v1/messages":
+            self.handle_messages()
+        else:
+            self.handle_github("POST")
+
+    def read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def send_json(self, status: int, data: object, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def rate_limit_headers(self) -> dict[str, str]:
+        with self.server.lock:
+            self.server.rate_remaining = max(self.server.rate_remaining - 1, 0)
+            remaining = self.server.rate_remaining
+        return {
+            "X-RateLimit-Limit": str(RATE_LIMIT),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Used": str(RATE_LIMIT - remaining),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def send_page(self, items: list, query: dict[str, str], headers: dict[str, str]) -> None:
+        page = int(query.get("page", 1))
+        per_page = min(int(query.get("per_page", 30)), 100)
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        path = urlparse(self.path).path
+
+        links = []
+        for rel, number in (("next", page + 1), ("last", last), ("first", 1), ("prev", page - 1)):
+            if (rel == "next" and page >= last) or (rel == "prev" and page <= 1):
+                continue
+            links.append(f'<{self.server.url}{path}?{urlencode({**query, "page": number})}>; rel="{rel}"')
+        if links:
+            headers["Link"] = ", ".join(links)
+        self.send_json(200, items[(page - 1) * per_page : page * per_page], headers)
+
+    def handle_github(self, method: str) -> None:
+        time.sleep(self.server.config.github_latency)
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = self.read_body() if method in ("POST", "PATCH") else {}
+        headers = self.rate_limit_headers()
+        data = self.server.data
+
+        route, status, payload = self.route_github(method, path, query, body, data)
+        self.server.count(f"github {method} {route}")
+        if status == 304:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+        elif isinstance(payload, list):
+            if route == "/orgs/{org}/repos":
+                headers["ETag"] = data.repos_etag
+            self.send_page(payload, query, headers)
+        else:
+            if method == "GET" and isinstance(payload, dict) and status == 200:
+                headers["ETag"] = etag(payload)
+            self.send_json(status, payload, headers)
+
+    def route_github(
+        self, method: str, path: str, query: dict[str, str], body: dict, data: MockData
+    ) -> tuple[str, int, object]:
+        if path == "/user":
+            return "/user", 200, {"login": USERNAME}
+        if path == "/user/orgs":
+            return "/user/orgs", 200, [{"login": ORG}]
+        if re.fullmatch(r"/users/[^/]+/events", path):
+            return "/users/{user}/events", 200, data.events
+        if re.fullmatch(r"/orgs/[^/]+/repos", path):
+            if self.headers.get("If-None-Match") == data.repos_etag:
+                return "/orgs/{org}/repos", 304, None
+            repos = sorted(data.repos, key=lambda repo: repo["pushed_at"], reverse=True)
+            return "/orgs/{org}/repos", 200, repos
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/commits", path):
+            since = query.get("since", "")
+            commits = [c for c in data.commits.get(match[1], []) if c["commit"]["author"]["date"] >= since]
+            return "/repos/{repo}/commits", 200, commits
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/pulls", path):
+            repo_pulls = data.pulls.setdefault(match[1], [])
+            if method == "POST":
+                number = len(repo_pulls) + 1
+                pull = {
+                    "number": number,
+                    "state": "open",
+                    "title": body.get("title", ""),
+                    "body": body.get("body", ""),
+                    "head": {
+                        "ref": body.get("head", ""),
+                        "sha": hashlib.sha1(body.get("head", "").encode()).hexdigest(),
+                    },
+                    "html_url": f"https://github.com/{match[1]}/pull/{number}",
+                }
+                repo_pulls.append(pull)
+                return "/repos/{repo}/pulls", 201, pull
+            head = query.get("head", "").partition(":")[2]
+            return (
+                "/repos/{repo}/pulls",
+                200,
+                [pull for pull in repo_pulls if pull["head"]["ref"] == head and pull["state"] == "open"],
+            )
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/pulls/(\d+)", path):
+            for pull in data.pulls.get(match[1], []):
+                if pull["number"] == int(match[2]):
+                    pull.update({key: body[key] for key in ("title", "body") if key in body})
+                    if method == "GET" and self.headers.get("If-None-Match") == etag(pull):
+                        return "/repos/{repo}/pulls/{number}", 304, None
+                    return "/repos/{repo}/pulls/{number}", 200, pull
+            return "/repos/{repo}/pulls/{number}", 404, {"message": "Not Found"}
+        if re.fullmatch(r"/repos/[^/]+/[^/]+", path):
+            repo = {"default_branch": "main"}
+            if self.headers.get("If-None-Match") == etag(repo):
+                return "/repos/{repo}", 304, None
+            return "/repos/{repo}", 200, repo
+        return path, 404, {"message": "Not Found"}
+
+    def handle_messages(self) -> None:
+        config = self.server.config
+        time.sleep(config.anthropic_latency)
+        request = self.read_body()
+        prompt_chars = sum(len(json.dumps(message)) for message in request.get("messages", []))
+
+        # a tiny max_tokens is the similarity check, which expects yes/no
+        similarity = request.get("max_tokens", 256) <= 8
+        words = ["no"] if similarity else [f"word{i}" for i in range(config.response_words)]
+        text = " ".join(words)
+        usage = {"input_tokens": prompt_chars // 4, "output_tokens": len(words)}
+
+        if request.get("stream"):
+            self.server.count("anthropic POST /v1/messages stream")
+            self.stream_message(request, words, usage)
+            return
+
+        self.server.count("anthropic POST /v1/messages")
+        self.send_json(
+            200,
+            {
+                "id": "msg_bench",
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model", ""),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": usage,
+            },
+        )
+
+    def stream_message(self, request: dict, words: list[str], usage: dict[str, int]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send_event(event: str, data: dict) -> None:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+            self.wfile.flush()
+
+        message = {
+            "id": "msg_bench",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", ""),
+            "content": [],
+            "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 0},
+        }
+        send_event("message_start", {"type": "message_start", "message": message})
+        send_event(
+            "content_block_start",
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        )
+        for i, word in enumerate(words):
+            time.sleep(self.server.config.stream_chunk_latency)
+            delta = {"type": "text_delta", "text": word if i == 0 else f" {word}"}
+            send_event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta})
+        send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        send_event(
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            },
+        )
+        send_event("message_stop", {"type": "message_stop"})
+        self.close_connection = True
@@ -0,0 +1,263 @@
+"""
+Offline benchmarks for `gus commit`, `gus pr` and `gus report`.
+
+Each command runs as a real subprocess against a synthetic repo and a local mock of
+GitHub and Anthropic, and reports wall time, peak RSS, API request counts and git
+subprocess counts (read from the run's --trace).
+
+Usage:
+    python -m benchmarks.run [--repeat N] [--files N] [--latency MS] [--json PATH] [--baseline PATH]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks.mock_api import MockAPIServer, MockConfig
+from benchmarks.synthetic_repo import RepoShape, generate_repo, unstage
+
+ROOT = Path(__file__).resolve().parent.parent
+SECRETS = {"ANTHROPIC_API_KEY": "bench-key", "GITHUB_TOKEN": "bench-token"}
+# relative slack before a slower or bigger run counts as a regression; request and subprocess counts must not grow
+DEFAULT_THRESHOLD = 0.2
+# few, long files with most lines edited: prompt assembly dominates peak memory
+LARGE_SHAPE = RepoShape(files=40, commits=2, file_lines=20_000, diff_files=20, diff_lines=5_000)
+# a wide work tree with a few scattered edits and new files: the scan for unstaged changes dominates
+MONOREPO_SHAPE = RepoShape(
+    files=100_000, commits=1, file_lines=4, diff_files=100, diff_lines=1, untracked=100, packages=5_000
+)
+
+
+@dataclass
+class Scenario:
+    name: str
+    args: list[str]
+    # what to delete before each run, relative to the gus config dir; nothing means a warm run
+    reset: list[str] = field(default_factory=list)
+    # key into the repo shapes built by main(); "large" has a diff and file contents of tens of MB
+    repo: str = "default"
+    # run on the repo before each run, untimed
+    prepare: Callable[[Path], None] | None = None
+
+
+SCENARIOS = [
+    Scenario("commit", ["commit", "--json"], reset=["cache"]),
+    Scenario("commit (cached)", ["commit", "--json"]),
+    Scenario("commit (alternatives)", ["commit", "--json", "-a", "3"], reset=["cache"]),
+    Scenario("pr", ["pr", "--json"], reset=["cache"]),
+    Scenario("pr (cached)", ["pr", "--json"]),
+    Scenario("commit (large diff)", ["commit", "--json"], reset=["cache"], repo="large"),
+    Scenario("pr (large diff)", ["pr", "--json"], reset=["cache"], repo="large"),
+    Scenario("commit (100k files)", ["commit", "--json", "--yes"], repo="monorepo", prepare=unstage),
+    Scenario("report", ["report", "--json", "--days", "7"], reset=["cache", "data"]),
+    Scenario("report (incremental)", ["report", "--json", "--days", "7"]),
+]
+
+
+class Environment:
+    def __init__(self, workdir: Path, server: MockAPIServer):
+        self.home = workdir / "home"
+        self.run_dir = workdir / "run"
+        self.config_dir = self.home / ".config" / "gus"
+        self.gitconfig = workdir / "gitconfig"
+        self.traces = workdir / "traces"
+        self.server = server
+
+        self.config_dir.mkdir(parents=True)
+        self.traces.mkdir()
+        self.gitconfig.write_text("[user]\n\tname = Bench\n\temail = bench@example.com\n")
+        (self.config_dir / "config.yaml").write_text(
+            json.dumps(
+                {
+                    "anthropic": {"api_url": f"{server.url}/v1/messages"},
+                    "github": {"api_url": server.url},
+                    "git": {"user_email": "bench@example.com", "user_name": "Bench"},
+                }
+            )
+        )
+        self.start_agent()
+
+    def start_agent(self) -> None:
+        # serves the credentials the way `gus agent` does, so no keyring is needed
+        from gustav import ipc
+
+        socket_path = self.run_dir / "gus" / "agent.sock"
+
+        def handler(message: dict) -> dict:
+            return {"ok": True, "value": SECRETS.get(message.get("name", ""))}
+
+        threading.Thread(target=ipc.serve, args=(socket_path, handler, 24 * 3600), daemon=True).start()
+        deadline = time.monotonic() + 5
+        while not ipc.is_running(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    @property
+    def env(self) -> dict[str, str]:
+        return {
+            **os.environ,
+            "HOME": str(self.home),
+            "XDG_RUNTIME_DIR": str(self.run_dir),
+            "GIT_CONFIG_GLOBAL": str(self.gitconfig),
+            "GUS_NO_DAEMON": "1",
+            "GUS_SKIP_PREWARM": "1",
+            "PYTHONPATH": str(ROOT),
+        }
+
+    def reset(self, names: list[str]) -> None:
+        for name in names:
+            shutil.rmtree(self.config_dir / name, ignore_errors=True)
+
+    def run(self, args: list[str], cwd: Path, run_id: int) -> dict:
+        trace = self.traces / f"{run_id}.json"
+        self.server.reset_counts()
+        with tempfile.TemporaryFile() as output:
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "gustav.cli", "--trace", str(trace), *args],
+                cwd=cwd,
+                env=self.env,
+                stdin=subprocess.DEVNULL,
+                stdout=output,
+                stderr=subprocess.STDOUT,
+            )
+            _, status, rusage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode != 0:
+                output.seek(0)
+                raise RuntimeError(output.read().decode(errors="replace").strip().splitlines()[-1:])
+
+        spans = json.loads(trace.read_text())["traceEvents"]
+        counts = dict(self.server.counts)
+        return {
+            "wall_ms": wall * 1000,
+            # ru_maxrss is in kilobytes on Linux
+            "rss_mb": rusage.ru_maxrss / 1024,
+            "github": sum(n for route, n in counts.items() if route.startswith("github")),
+            "anthropic": sum(n for route, n in counts.items() if route.startswith("anthropic")),
+            "git": sum(1 for span in spans if span["name"].startswith("git ")),
+            "input_tokens": sum(span["args"].get("input_tokens", 0) for span in spans if span["name"] == "claude"),
+        }
+
+
+def bench(env: Environment, scenario: Scenario, repo: Path, repeat: int) -> dict:
+    if not scenario.reset:
+        if scenario.prepare:
+            scenario.prepare(repo)
+        env.run(scenario.args, repo, run_id=0)
+
+    runs = []
+    for i in range(repeat):
+        env.reset(scenario.reset)
+        if scenario.prepare:
+            scenario.prepare(repo)
+        runs.append(env.run(scenario.args, repo, run_id=i + 1))
+
+    return {
+        "scenario": scenario.name,
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+        "rss_mb": round(max(run["rss_mb"] for run in runs), 1),
+        **{key: runs[-1][key] for key in ("github", "anthropic", "git", "input_tokens")},
+    }
+
+
+def find_regressions(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    previous = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        for key in ("wall_ms", "rss_mb"):
+            if result[key] > before[key] * (1 + threshold):
+                regressions.append(f"{result['scenario']}: {key} {before[key]} -> {result[key]}")
+        for key in ("github", "anthropic", "git", "input_tokens"):
+            if result[key] > before.get(key, result[key]):
+                regressions.append(f"{result['scenario']}: {key} {before[key]} -> {result[key]}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark gus commands against local GitHub and Anthropic mocks")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Runs per scenario (default: 3)")
+    parser.add_argument("--scenario", "-s", action="append", help="Only run scenarios with this name prefix")
+    parser.add_argument("--files", type=int, default=200, help="Files in the synthetic repo (default: 200)")
+    parser.add_argument("--commits", type=int, default=100, help="Commits in the synthetic repo (default: 100)")
+    parser.add_argument("--file-lines", type=int, default=80, help="Lines per file (default: 80)")
+    parser.add_argument("--diff-files", type=int, default=10, help="Files changed per diff (default: 10)")
+    parser.add_argument("--diff-lines", type=int, default=20, help="Lines changed per file (default: 20)")
+    parser.add_argument("--latency", type=float, default=0, help="Added latency per API request in ms (default: 0)")
+    parser.add_argument("--events", type=int, default=200, help="GitHub events for report (default: 200)")
+    parser.add_argument("--repos", type=int, default=50, help="Org repos for report (default: 50)")
+    parser.add_argument("--json", dest="json_path", type=Path, help="Write results to a JSON file")
+    parser.add_argument("--baseline", type=Path, help="Fail when results regress against this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (default: 0.2)")
+    args = parser.parse_args()
+
+    logger.remove()
+    latency = args.latency / 1000
+    server = MockAPIServer(
+        MockConfig(github_latency=latency, anthropic_latency=latency, events=args.events, repos=args.repos)
+    ).start()
+    scenarios = [s for s in SCENARIOS if not args.scenario or any(s.name.startswith(p) for p in args.scenario)]
+
+    shapes = {
+        "default": RepoShape(args.files, args.commits, args.file_lines, args.diff_files, args.diff_lines),
+        "large": LARGE_SHAPE,
+        "monorepo": MONOREPO_SHAPE,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="gus-bench-") as tmp:
+        workdir = Path(tmp)
+        repos = {}
+        for name in dict.fromkeys(scenario.repo for scenario in scenarios):
+            shape = shapes[name]
+            start = time.perf_counter()
+            repos[name] = generate_repo(workdir / f"repo-{name}", shape)
+            print(f"Generated {shape.files} files / {shape.commits} commits in {time.perf_counter() - start:.1f}s")
+
+        env = Environment(workdir, server)
+        results = []
+        for scenario in scenarios:
+            try:
+                results.append(bench(env, scenario, repos[scenario.repo], args.repeat))
+            except RuntimeError as e:
+                results.append({"scenario": scenario.name, "error": str(e)})
+
+    print(f"{'scenario':<22} {'wall ms':>8} {'rss MB':>7} {'github':>7} {'claude':>7} {'git':>5} {'tokens':>7}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['scenario']:<22} error: {result['error']}")
+            continue
+        print(
+            f"{result['scenario']:<22} {result['wall_ms']:>8} {result['rss_mb']:>7} {result['github']:>7}"
+            f" {result['anthropic']:>7} {result['git']:>5} {result['input_tokens']:>7}"
+        )
+
+    if args.json_path:
+        args.json_path.write_text(json.dumps(results, indent=2))
+        print(f"Results saved to {args.json_path}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = find_regressions([r for r in results if "error" not in r], baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Build synthetic git repositories of a given size.
+
+History is written with a single `git fast-import` stream, so large repos take seconds.
+The result has `main` mirrored to `origin/main`, a `feature` branch with committed
+changes for `gus pr`, and staged changes on top of it for `gus commit`. `unstage` turns
+those into unstaged and untracked files, for `gus commit --yes` to find and stage.
+"""
+
+import random
+import subprocess
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+REMOTE_URL = "https://github.com/bench-org/service-0.git"
+AUTHOR = "Bench <bench@example.com>"
+EPOCH = 1_700_000_000
+# the "Feature work" commit, which unstage() resets to
+BASE_REF = "refs/bench/base"
+
+
+@dataclass
+class RepoShape:
+    files: int = 200
+    commits: int = 100
+    file_lines: int = 80
+    diff_files: int = 10
+    diff_lines: int = 20
+    # new files added to the staged changes
+    untracked: int = 0
+    # directories the files are spread over
+    packages: int = 20
+    seed: int = 0
+
+
+def file_path(index: int, packages: int = 20) -> str:
+    return f"src/pkg{index % packages}/module_{index}.py"
+
+
+def render_file(index: int, lines: int, revision: int) -> bytes:
+    body = [
+        f"def function_{index}_{line}(value):\n    return value + {line * (revision + 1)}\n"
+        for line in range(lines // 2)
+    ]
+    return f"# module {index} revision {revision}\n{''.join(body)}".encode()
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def fast_import_stream(shape: RepoShape) -> Iterator[bytes]:
+    # yielded in pieces, so even 100k files never sit in memory at once (which would inflate every later RSS reading)
+    rng = random.Random(shape.seed)
+    revisions = [0] * shape.files
+
+    def data(content: bytes) -> bytes:
+        return b"data %d\n%s\n" % (len(content), content)
+
+    for commit in range(shape.commits):
+        yield b"commit refs/heads/main\n"
+        yield f"committer {AUTHOR} {EPOCH + commit * 3600} +0000\n".encode()
+        if commit == 0:
+            yield data(b"Initial import")
+            changed = range(shape.files)
+        else:
+            changed = rng.sample(range(shape.files), min(3, shape.files))
+            yield data(f"Update {', '.join(file_path(i, shape.packages) for i in changed)}".encode())
+        for index in changed:
+            revisions[index] += 1
+            yield f"M 100644 inline {file_path(index, shape.packages)}\n".encode()
+            yield data(render_file(index, shape.file_lines, revisions[index]))
+
+
+def fast_import(repo: Path, shape: RepoShape) -> None:
+    process = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=repo, stdin=subprocess.PIPE)
+    assert process.stdin
+    with process.stdin as stdin:
+        for chunk in fast_import_stream(shape):
+            stdin.write(chunk)
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, "git fast-import")
+
+
+def edit_files(repo: Path, shape: RepoShape, revision: int, offset: int) -> list[str]:
+    changed = []
+    for index in range(offset, offset + shape.diff_files):
+        path = repo / file_path(index % shape.files, shape.packages)
+        lines = path.read_text().splitlines(keepends=True)
+        for line in range(min(shape.diff_lines, len(lines))):
+            position = (line * 7) % len(lines)
+            lines[position] = f"# edited in revision {revision}: {lines[position]}"
+        path.write_text("".join(lines))
+        changed.append(str(path.relative_to(repo)))
+    return changed
+
+
+def generate_repo(repo: Path, shape: RepoShape) -> Path:
+    repo.mkdir(parents=True, exist_ok=True)
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.name", "Bench")
+    git(repo, "config", "user.email", "bench@example.com")
+    fast_import(repo, shape)
+    git(repo, "checkout", "-q", "-f", "main")
+    git(repo, "remote", "add", "origin", REMOTE_URL)
+    git(repo, "update-ref", "refs/remotes/origin/main", "main")
+
+    git(repo, "checkout", "-q", "-b", "feature")
+    git(repo, "add", *edit_files(repo, shape, revision=1, offset=0))
+    git(repo, "commit", "-q", "-m", "Feature work")
+    git(repo, "update-ref", BASE_REF, "HEAD")
+    git(repo, "add", *edit_files(repo, shape, revision=2, offset=shape.diff_files), *add_files(repo, shape))
+    return repo
+
+
+def add_files(repo: Path, shape: RepoShape) -> list[str]:
+    added = []
+    for index in range(shape.untracked):
+        path = repo / "src" / "new" / f"module_{index}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(render_file(index, shape.file_lines, 0))
+        added.append(str(path.relative_to(repo)))
+    return added
+
+
+def unstage(repo: Path) -> None:
+    # back to the "Feature work" commit with the staged changes left in the work tree, also after gus commit ran
+    git(repo, "reset", "-q", BASE_REF)
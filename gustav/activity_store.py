@@ -0,0 +1,184 @@
+import json
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from gustav.paths import DATA_DIR
+from gustav.records import Activity, CommitRecord, EventRecord, group_activity
+
+ACTIVITY_DB = DATA_DIR / "activity.db"
+
+# bump when the schema changes; older stores are dropped and refetched from GitHub
+SCHEMA_VERSION = 2
+TABLES = ["events", "commits", "repos", "repo_indexes", "cursors"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    type TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    action TEXT NOT NULL,
+    title TEXT NOT NULL,
+    commits TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_user_day ON events (username, day);
+
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (repo, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_user_day ON commits (username, day);
+
+CREATE TABLE IF NOT EXISTS repos (
+    full_name TEXT PRIMARY KEY,
+    org TEXT NOT NULL,
+    pushed_at TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS repos_org_pushed ON repos (org, pushed_at);
+
+CREATE TABLE IF NOT EXISTS repo_indexes (
+    org TEXT PRIMARY KEY,
+    etag TEXT,
+    refreshed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cursors (
+    scope TEXT PRIMARY KEY,
+    since TEXT NOT NULL,
+    high_water TEXT NOT NULL
+);
+"""
+
+
+class Cursor(NamedTuple):
+    since: str
+    high_water: str
+
+
+class RepoIndex(NamedTuple):
+    etag: str | None
+    refreshed_at: str
+    pushed_high: str | None
+
+
+class ActivityStore:
+    def __init__(self, path: Path = ACTIVITY_DB):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            for table in TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "ActivityStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def get_cursor(self, scope: str) -> Cursor | None:
+        row = self.conn.execute("SELECT since, high_water FROM cursors WHERE scope = ?", (scope,)).fetchone()
+        return Cursor(*row) if row else None
+
+    def set_cursor(self, scope: str, cursor: Cursor) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cursors (scope, since, high_water) VALUES (?, ?, ?)",
+            (scope, cursor.since, cursor.high_water),
+        )
+        self.conn.commit()
+
+    def get_repo_index(self, org: str) -> RepoIndex | None:
+        row = self.conn.execute("SELECT etag, refreshed_at FROM repo_indexes WHERE org = ?", (org,)).fetchone()
+        if not row:
+            return None
+        (pushed_high,) = self.conn.execute("SELECT MAX(pushed_at) FROM repos WHERE org = ?", (org,)).fetchone()
+        return RepoIndex(row[0], row[1], pushed_high)
+
+    def update_repo_index(self, org: str, repos: list[dict], etag: str | None, refreshed_at: str, full: bool) -> None:
+        if full:
+            self.conn.execute("DELETE FROM repos WHERE org = ?", (org,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO repos (full_name, org, pushed_at, archived, size) VALUES (?, ?, ?, ?, ?)",
+            [(r["full_name"], org, r["pushed_at"], int(r["archived"]), r["size"]) for r in repos if r["full_name"]],
+        )
+        if full:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repo_indexes (org, etag, refreshed_at) VALUES (?, ?, ?)",
+                (org, etag, refreshed_at),
+            )
+        else:
+            self.conn.execute("UPDATE repo_indexes SET etag = ? WHERE org = ?", (etag, org))
+        self.conn.commit()
+
+    def get_repos_pushed_since(self, org: str, since: str) -> list[str]:
+        rows = self.conn.execute(
+            "SELECT full_name FROM repos WHERE org = ? AND pushed_at >= ? ORDER BY pushed_at DESC", (org, since)
+        )
+        return [full_name for (full_name,) in rows]
+
+    def count_repos(self, org: str) -> int:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM repos WHERE org = ?", (org,)).fetchone()
+        return count
+
+    def add_events(self, username: str, events: Iterable[EventRecord]) -> int:
+        rows = (
+            (
+                event.id,
+                username,
+                event.day,
+                event.type,
+                event.repo,
+                event.action,
+                event.title,
+                json.dumps([[commit.sha, commit.message] for commit in event.commits]),
+            )
+            for event in events
+        )
+        cursor = self.conn.executemany(
+            "INSERT OR IGNORE INTO events (id, username, day, type, repo, action, title, commits)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def add_commits(self, username: str, commits: Iterable[CommitRecord]) -> int:
+        rows = ((commit.repo, commit.sha, username, commit.day, commit.message) for commit in commits)
+        cursor = self.conn.executemany(
+            "INSERT OR REPLACE INTO commits (repo, sha, username, day, message) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def activity_by_day(self, username: str, since_day: str) -> Activity:
+        commits = [
+            CommitRecord(*row)
+            for row in self.conn.execute(
+                "SELECT sha, repo, day, message FROM commits WHERE username = ? AND day >= ? ORDER BY day, rowid",
+                (username, since_day),
+            )
+        ]
+
+        events: list[EventRecord] = []
+        rows = self.conn.execute(
+            "SELECT id, type, repo, day, action, title, commits FROM events"
+            " WHERE username = ? AND day >= ? ORDER BY CAST(id AS INTEGER)",
+            (username, since_day),
+        )
+        for event_id, event_type, repo, day, action, title, commits_json in rows:
+            event_commits = tuple(CommitRecord(sha, repo, day, message) for sha, message in json.loads(commits_json))
+            events.append(EventRecord(event_id, event_type, repo, day, action, title, event_commits))
+
+        return group_activity(commits, events)
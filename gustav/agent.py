@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+from gustav import ipc
+from gustav.paths import APP_NAME, RUN_DIR
+
+AGENT_SOCKET = RUN_DIR / "agent.sock"
+DEFAULT_IDLE_TIMEOUT = 8 * 60 * 60
+
+
+def get_secret(name: str) -> tuple[bool, str | None]:
+    # (whether the agent answered, the secret); the agent reads the keychain itself, so its None is final
+    response = ipc.request(AGENT_SOCKET, {"op": "get", "name": name})
+    if not response or not response.get("ok"):
+        return False, None
+    return True, response.get("value")
+
+
+def forget_secrets() -> None:
+    ipc.request(AGENT_SOCKET, {"op": "forget"})
+
+
+def agent_running() -> bool:
+    return ipc.is_running(AGENT_SOCKET)
+
+
+def stop_agent() -> bool:
+    return ipc.request(AGENT_SOCKET, {"op": "stop"}) is not None
+
+
+def start_agent(idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> bool:
+    if agent_running():
+        return False
+    subprocess.Popen(
+        [sys.executable, "-m", "gustav.cli", "agent", "run", "--timeout", str(int(idle_timeout))],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if agent_running():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_agent(idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+    import keyring
+
+    secrets: dict[str, str] = {}
+
+    def handle(message: dict) -> dict:
+        op = message.get("op")
+        if op == "get":
+            name = message.get("name", "")
+            if name not in secrets:
+                value = keyring.get_password(APP_NAME, name)
+                if value is None:
+                    return {"ok": True, "value": None}
+                logger.debug(f"Agent loaded {name} from keychain")
+                secrets[name] = value
+            return {"ok": True, "value": secrets[name]}
+        if op == "forget":
+            secrets.clear()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    ipc.serve(AGENT_SOCKET, handle, idle_timeout)
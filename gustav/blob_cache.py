@@ -0,0 +1,77 @@
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from loguru import logger
+
+from gustav.paths import CACHE_DIR
+
+# summaries of git blobs, shared by gus commit (index blobs) and gus pr (HEAD blobs): a file version that was sent
+# once is sent as its summary afterwards
+BLOB_CACHE_DB = CACHE_DIR / "blobs.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    blob TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_used ON summaries (used);
+"""
+
+
+def connect(path: Path = BLOB_CACHE_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_summaries(blobs: list[str]) -> dict[str, str]:
+    if not blobs or not BLOB_CACHE_DB.exists():
+        return {}
+    placeholders = ", ".join("?" * len(blobs))
+    try:
+        with closing(connect()) as conn, conn:
+            rows = conn.execute(f"SELECT blob, summary FROM summaries WHERE blob IN ({placeholders})", blobs).fetchall()
+            conn.execute(f"UPDATE summaries SET used = ? WHERE blob IN ({placeholders})", [time.time(), *blobs])
+    except sqlite3.Error as e:
+        logger.debug(f"Could not read blob summaries: {e}")
+        return {}
+    return dict(rows)
+
+
+def add_summaries(summaries: dict[str, tuple[str, str]], max_bytes: int) -> None:
+    # blob -> (path, summary); the least recently used summaries beyond max_bytes are evicted
+    if not summaries:
+        return
+    now = time.time()
+    rows = [(blob, path, summary, len(summary.encode()), now) for blob, (path, summary) in summaries.items()]
+    try:
+        with closing(connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                """
+                DELETE FROM summaries WHERE blob IN (
+                    SELECT blob FROM (SELECT blob, SUM(bytes) OVER (ORDER BY used DESC, blob) AS total FROM summaries)
+                    WHERE total > ?
+                )
+                """,
+                (max_bytes,),
+            )
+    except sqlite3.Error as e:
+        logger.debug(f"Could not store blob summaries: {e}")
+
+
+def count_summaries() -> int:
+    if not BLOB_CACHE_DB.exists():
+        return 0
+    with closing(connect()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+
+def clear_summaries() -> None:
+    BLOB_CACHE_DB.unlink(missing_ok=True)
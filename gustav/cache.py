@@ -1,31 +1,60 @@
 import hashlib
 import json
 
-from gustav.settings import CACHE_DIR
+from gustav.blob_cache import clear_summaries
+from gustav.paths import CACHE_DIR
+from gustav.pr_index import clear_index
+from gustav.tracing import span
+
+# process-local copy of entries already read or written with the mtime of the file they came from, so long-lived
+# processes (gus daemon) skip re-parsing; the file stays the source of truth, since the prewarm worker and runs
+# outside the daemon write it too, and an entry is reloaded once its file changes and dropped once it is gone
+_memory: dict[str, tuple[int, dict]] = {}
 
 
 def get_cache_key(*args: str) -> str:
-    content = "".join(args)
-    return hashlib.sha256(content.encode()).hexdigest()[:16]
+    digest = hashlib.sha256()
+    for arg in args:
+        digest.update(arg.encode())
+    return digest.hexdigest()[:16]
 
 
 def get_cached(cache_key: str) -> dict | None:
+    with span("cache get", key=cache_key) as attributes:
+        data = _get_cached(cache_key)
+        attributes["hit"] = data is not None
+    return data
+
+
+def _get_cached(cache_key: str) -> dict | None:
     cache_file = CACHE_DIR / f"{cache_key}.json"
-    if cache_file.exists():
-        try:
-            return json.loads(cache_file.read_text())
-        except (json.JSONDecodeError, OSError):
-            return None
-    return None
+    try:
+        mtime = cache_file.stat().st_mtime_ns
+    except OSError:
+        _memory.pop(cache_key, None)
+        return None
+    if (entry := _memory.get(cache_key)) and entry[0] == mtime:
+        return entry[1]
+    try:
+        data = json.loads(cache_file.read_text())
+    except (json.JSONDecodeError, OSError):
+        return None
+    _memory[cache_key] = (mtime, data)
+    return data
 
 
 def set_cached(cache_key: str, data: dict) -> None:
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_file = CACHE_DIR / f"{cache_key}.json"
-    cache_file.write_text(json.dumps(data))
+    with span("cache set", key=cache_key):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = CACHE_DIR / f"{cache_key}.json"
+        cache_file.write_text(json.dumps(data))
+        _memory[cache_key] = (cache_file.stat().st_mtime_ns, data)
 
 
 def clear_cache() -> None:
+    _memory.clear()
+    clear_summaries()
+    clear_index()
     if CACHE_DIR.exists():
         for f in CACHE_DIR.glob("*.json"):
             f.unlink()
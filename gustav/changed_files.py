@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+
+from loguru import logger
+
+from gustav.blob_cache import add_summaries, get_summaries
+from gustav.clients.git import GitClient
+from gustav.outline import OUTLINE_MIN_CHARS, build_outline, build_summary
+from gustav.prompts.loader import Segments
+from gustav.settings import FilesSettings
+from gustav.tracing import span
+
+ATTRIBUTES = ["linguist-generated", "diff"]
+# how much of a file is searched for NUL bytes, like git's own binary detection
+BINARY_SNIFF_BYTES = 8000
+
+
+@dataclass(frozen=True, slots=True)
+class ChangedFile:
+    path: str
+    # the blob in the index (commit) or HEAD (pr); None when the change deletes the file
+    blob: str | None
+    size: int
+    # None when git counts the file as binary
+    lines: tuple[int, int] | None
+    generated: bool
+    no_diff: bool
+
+    @property
+    def binary(self) -> bool:
+        return self.lines is None or self.no_diff
+
+    @property
+    def changed_lines(self) -> int:
+        return sum(self.lines or (0, 0))
+
+
+def classify_files(
+    git: GitClient, numstat: dict[str, tuple[int, int] | None], revision: str, cached: bool = False
+) -> list[ChangedFile]:
+    # one numstat, one cat-file and one check-attr for all files, however many there are
+    with span("classify_files", files=len(numstat)):
+        paths = list(numstat)
+        objects = git.get_object_info([f"{revision}:{path}" for path in paths])
+        attributes = git.get_attributes(paths, ATTRIBUTES, cached=cached)
+        files = []
+        for path, info in zip(paths, objects, strict=True):
+            values = attributes.get(path, {})
+            files.append(
+                ChangedFile(
+                    path,
+                    info[0] if info else None,
+                    info[1] if info else 0,
+                    numstat[path],
+                    values.get("linguist-generated") in ("set", "true"),
+                    values.get("diff") == "unset",
+                )
+            )
+    return files
+
+
+def format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f} MB"
+    if size >= 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size} B"
+
+
+def content_omission(file: ChangedFile, settings: FilesSettings) -> str | None:
+    if file.binary:
+        return f"binary, {format_size(file.size)}"
+    if file.generated and not settings.include_generated:
+        return "generated"
+    if file.size > settings.max_file_size:
+        return f"{format_size(file.size)}, over the {format_size(settings.max_file_size)} limit"
+    return None
+
+
+def diff_omission(file: ChangedFile, settings: FilesSettings) -> str | None:
+    if file.generated and not settings.include_generated:
+        return "generated"
+    if file.changed_lines > settings.max_diff_lines:
+        return f"{file.changed_lines} changed lines, over the {settings.max_diff_lines} limit"
+    return None
+
+
+def get_diff_omissions(files: list[ChangedFile], settings: FilesSettings) -> dict[str, str]:
+    return {file.path: reason for file in files if (reason := diff_omission(file, settings))}
+
+
+def decode_text(content: bytes) -> str | None:
+    if b"\x00" in content[:BINARY_SNIFF_BYTES]:
+        return None
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def build_files_content(
+    git: GitClient,
+    files: list[ChangedFile],
+    settings: FilesSettings,
+    skip: set[str] | None = None,
+    changed: dict[str, list[tuple[int, int]]] | None = None,
+) -> Segments:
+    # deleted files and the targets of renames are left out; binary, generated and oversized files become stubs;
+    # with changed line ranges, large text files are sent as outlines around them; a large file with no changes in
+    # the diff is sent as the cached summary of its version when an earlier run stored one, which is the outline it
+    # would get anyway
+    included = [(file, blob) for file in files if (blob := file.blob) and file.path not in (skip or set())]
+    omitted = {file.path: reason for file, _ in included if (reason := content_omission(file, settings))}
+    unchanged = [
+        (file, blob)
+        for file, blob in included
+        if changed is not None
+        and not changed.get(file.path)
+        and file.path not in omitted
+        and file.size >= OUTLINE_MIN_CHARS
+    ]
+    stored = get_summaries([blob for _, blob in unchanged]) if settings.summary_cache_mb else {}
+    # by path, since a copied file shares its blob with a path that may have changes
+    summaries = {file.path: stored[blob] for file, blob in unchanged if blob in stored}
+    to_read = [blob for file, blob in included if file.path not in omitted and file.path not in summaries]
+    blobs = git.read_blobs(list(dict.fromkeys(to_read)))
+
+    content_parts: Segments = []
+    new_summaries: dict[str, tuple[str, str]] = {}
+    for file, blob in included:
+        if content_parts:
+            content_parts.append("\n\n")
+        if summary := summaries.get(file.path):
+            content_parts.extend([f'<file path="{file.path}" view="summary">\n', summary, "\n</file>"])
+            continue
+
+        reason = omitted.get(file.path)
+        text = None if reason else decode_text(blobs.get(blob, b""))
+        if reason or text is None:
+            reason = reason or "binary"
+            logger.debug(f"Omitting {file.path} from prompt: {reason}")
+            content_parts.append(f'<file path="{file.path}" omitted="{reason}" />')
+            continue
+
+        if settings.summary_cache_mb and blob not in stored and (summary := build_summary(blob, file.path, text)):
+            new_summaries[blob] = (file.path, summary)
+        if changed is not None and (outline := build_outline(blob, file.path, text, changed.get(file.path, []))):
+            content_parts.extend([f'<file path="{file.path}" view="outline">\n', outline, "\n</file>"])
+        else:
+            content_parts.extend([f'<file path="{file.path}">\n', text, "\n</file>"])
+
+    if summaries or new_summaries:
+        logger.debug(f"Blob summaries: {len(summaries)} reused, {len(new_summaries)} stored")
+    add_summaries(new_summaries, settings.summary_cache_mb * 1024 * 1024)
+    return content_parts
@@ -1,32 +1,104 @@
-import click
-from pydantic import ValidationError
+import os
+import sys
+from importlib import import_module
 
-from gustav.commands.cache import cache
-from gustav.commands.commit import commit
-from gustav.commands.init import init
-from gustav.commands.pull_request import pull_request
-from gustav.commands.report import report
-from gustav.commands.status import status
-from gustav.logging import setup_logging
-from gustav.settings import load_settings, config_exist
+import click
 
 COMMANDS_REQUIRING_SETTINGS = {"commit", "report", "pr"}
 
+# name -> (import path, short help); modules are imported only when the command is dispatched
+LAZY_COMMANDS = {
+    "init": ("gustav.commands.init:init", "Initialize gustav"),
+    "status": ("gustav.commands.status:status", "Show configuration status"),
+    "agent": ("gustav.commands.agent:agent", "Manage the in-memory credential agent"),
+    "daemon": ("gustav.commands.daemon:daemon", "Serve commit, pr and report from a warm background process"),
+    "cache": ("gustav.commands.cache:cache", "Manage cached data"),
+    "commit": ("gustav.commands.commit:commit", "Generate commit message and commit staged changes"),
+    "report": ("gustav.commands.report:report", "Generate a daily work report from GitHub activity"),
+    "pr": ("gustav.commands.pull_request:pull_request", "Create or update pull request"),
+    "prewarm": ("gustav.commands.prewarm:prewarm", "Generate the commit message for staged changes in the background"),
+    "usage": ("gustav.commands.usage:usage", "Show Claude token usage and latency"),
+}
+
+
+class LazyGroup(click.Group):
+    def __init__(self, *args, lazy_commands: dict[str, tuple[str, str]] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
 
-@click.group()
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.commands or cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+        import_path, _ = self.lazy_commands[cmd_name]
+        module_name, attr = import_path.split(":")
+        command = getattr(import_module(module_name), attr)
+        if not isinstance(command, click.Command):
+            raise click.ClickException(f"Lazy command '{cmd_name}' did not resolve to a click command")
+        self.add_command(command, name=cmd_name)
+        return command
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width)))
+            else:
+                rows.append((name, self.lazy_commands[name][1]))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
+@click.option(
+    "--trace", "trace_path", type=click.Path(dir_okay=False), help="Write a timing trace of this run to a file"
+)
+@click.option(
+    "--trace-format",
+    type=click.Choice(["chrome", "otel"]),
+    default="chrome",
+    show_default=True,
+    help="Chrome trace (Perfetto) or OTLP JSON",
+)
 @click.pass_context
-def main(ctx: click.Context):
+def main(ctx: click.Context, trace_path: str | None, trace_format: str):
     """AI-powered Git/GitHub tools"""
+    from gustav.logging import setup_logging
+
     setup_logging()
     ctx.ensure_object(dict)
 
     invoked = ctx.invoked_subcommand
+    if trace_path:
+        from pathlib import Path
+
+        from gustav.tracing import start_tracing, write_trace
+
+        start_tracing(f"gus {invoked}")
+        ctx.call_on_close(lambda: write_trace(Path(trace_path), trace_format))
+
     if invoked in COMMANDS_REQUIRING_SETTINGS:
+        from pydantic import ValidationError
+
+        from gustav.usage import set_command
+
+        set_command(invoked)
+
+        from gustav.settings import config_exist, load_settings
+        from gustav.tracing import span
+
         if not config_exist():
             raise click.ClickException("Settings not found. Run 'gus init' first.")
 
         try:
-            ctx.obj = load_settings()
+            with span("load_settings"):
+                ctx.obj = load_settings()
         except FileNotFoundError as e:
             raise click.ClickException(str(e)) from None
         except ValidationError as e:
@@ -35,12 +107,15 @@ def main(ctx: click.Context):
             raise click.ClickException(str(e)) from None
 
 
-main.add_command(init)
-main.add_command(status)
-main.add_command(cache)
-main.add_command(commit)
-main.add_command(report)
-main.add_command(pull_request, name="pr")
+def run() -> None:
+    args = sys.argv[1:]
+    if args and args[0] in COMMANDS_REQUIRING_SETTINGS and not os.environ.get("GUS_NO_DAEMON"):
+        from gustav.daemon import forward
+
+        exit_code = forward(args)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    main()
 
 
 if __name__ == "__main__":
@@ -1,49 +1,90 @@
+import json
 import time
+from collections.abc import Iterator
+from json.encoder import encode_basestring
 
 import click
-import httpx
 from loguru import logger
 
+from gustav.clients.http import get_http_client
+from gustav.prompts.loader import RenderedPrompt
 from gustav.settings import AnthropicSettings
+from gustav.tracing import span
+from gustav.usage import record_usage
 
-Message = dict[str, str]
+Message = dict[str, str | RenderedPrompt]
+
+
+def encode_messages_body(model: str, max_tokens: int, messages: list[Message]) -> list[bytes]:
+    # the JSON body as a list of chunks: prompt segments are escaped one at a time and never joined into one string
+    chunks: list[bytes] = [json.dumps({"model": model, "max_tokens": max_tokens})[:-1].encode()]
+    chunks.append(b', "messages": [')
+    for i, message in enumerate(messages):
+        content = message["content"]
+        segments = content.segments if isinstance(content, RenderedPrompt) else (content,)
+        chunks.append(b'%s{"role": %s, "content": "' % (b", " if i else b"", json.dumps(message["role"]).encode()))
+        for segment in segments:
+            # drop the quotes; only one segment's unsliced copy is alive at a time
+            chunks.append(encode_basestring(segment).encode()[1:-1])
+        chunks.append(b'"}')
+    chunks.append(b"]}")
+    return chunks
+
+
+def iter_chunks(chunks: list[bytes]) -> Iterator[bytes]:
+    yield from chunks
 
 
 class ClaudeClient:
     def __init__(self, settings: AnthropicSettings):
         self.settings = settings
 
-    def ask(self, prompt: str, prompt_name: str, max_tokens: int = 256) -> str:
-        messages = [{"role": "user", "content": prompt}]
+    def ask(self, prompt: str | RenderedPrompt, prompt_name: str, max_tokens: int = 256) -> str:
+        messages: list[Message] = [{"role": "user", "content": prompt}]
         return self._request(messages, prompt_name, max_tokens)
 
     def chat(self, messages: list[Message], prompt_name: str, max_tokens: int = 256) -> str:
         return self._request(messages, prompt_name, max_tokens)
 
     def _request(self, messages: list[Message], prompt_name: str, max_tokens: int) -> str:
+        route = self.settings.get_route(prompt_name)
+        model = route.model or self.settings.model
+        max_tokens = route.max_tokens or max_tokens
+        timeout = route.timeout or self.settings.timeout
+        logger.debug(f"Claude route [{prompt_name}]: model={model} max_tokens={max_tokens} timeout={timeout}s")
+
         start = time.perf_counter()
-        response = httpx.post(
-            self.settings.api_url,
-            headers={
-                "Content-Type": "application/json",
-                "x-api-key": self.settings.api_key.get_secret_value(),
-                "anthropic-version": self.settings.api_version,
-            },
-            json={
-                "model": self.settings.model,
-                "max_tokens": max_tokens,
-                "messages": messages,
-            },
-            timeout=self.settings.timeout,
-        )
-        elapsed = time.perf_counter() - start
+        with span("claude", prompt=prompt_name, model=model, max_tokens=max_tokens) as attributes:
+            body = encode_messages_body(model, max_tokens, messages)
+            length = sum(len(chunk) for chunk in body)
+            attributes["request_bytes"] = length
+            response = get_http_client().post(
+                self.settings.api_url,
+                headers={
+                    "Content-Type": "application/json",
+                    # a known length keeps httpx from switching the iterator to chunked transfer encoding
+                    "Content-Length": str(length),
+                    "x-api-key": self.settings.api_key.get_secret_value(),
+                    "anthropic-version": self.settings.api_version,
+                },
+                content=iter_chunks(body),
+                timeout=timeout,
+            )
+            elapsed = time.perf_counter() - start
 
-        data = response.json()
+            data = response.json()
+            attributes["status"] = response.status_code
+            for key, value in (data.get("usage") or {}).items():
+                if isinstance(value, int):
+                    attributes[key] = value
         if "error" in data:
             logger.error(f"Claude API request error: {data['error']}")
             raise click.ClickException(f"Claude API error: {data['error']['message']}")
 
+        usage = data.get("usage") or {}
+        record_usage(prompt_name, data.get("model") or model, usage, elapsed)
         logger.debug(
-            f"Claude API response [{prompt_name}]: length={len(data['content'][0]['text'])} elapsed={elapsed:.2f}s"
+            f"Claude API response [{prompt_name}]: model={model} length={len(data['content'][0]['text'])} elapsed={elapsed:.2f}s "
+            f"input_tokens={usage.get('input_tokens')} output_tokens={usage.get('output_tokens')}"
         )
         return data["content"][0]["text"]
@@ -1,14 +1,67 @@
 import os
 import re
 import subprocess
+from typing import NamedTuple
 
 import click
 from loguru import logger
 
+from gustav.tracing import span
+
+# fields before the path in each kind of porcelain v2 status entry
+STATUS_FIELDS = {"1": 8, "2": 9, "u": 10}
+
+
+def parse_numstat(output: str) -> dict[str, tuple[int, int] | None]:
+    # "added\tdeleted\tpath\0", or "added\tdeleted\t\0old\0new\0" for renames; binary files count as "-"
+    stats: dict[str, tuple[int, int] | None] = {}
+    fields = iter(output.split("\0"))
+    for field in fields:
+        if not field:
+            continue
+        added, deleted, path = field.split("\t", 2)
+        if not path:
+            next(fields, None)
+            path = next(fields, "")
+        stats[path] = None if added == "-" else (int(added), int(deleted))
+    return stats
+
+
+def parse_status(output: str) -> list[str]:
+    # porcelain v2 with -z: "1 XY sub mH mI mW hH hI path", "2 XY ... Xscore path\0orig", "u XY ... h3 path" and
+    # "? path"; X is the index side and Y the work tree side, "." meaning unchanged
+    paths = []
+    fields = iter(output.split("\0"))
+    for entry in fields:
+        kind = entry[:1]
+        if kind == "?":
+            paths.append(entry[2:])
+        elif kind in STATUS_FIELDS:
+            parts = entry.split(" ", STATUS_FIELDS[kind])
+            if kind == "2":
+                next(fields, None)
+            if kind == "u" or parts[1][1] != ".":
+                paths.append(parts[-1])
+    return paths
+
+
+class RemoteBranch(NamedTuple):
+    exists: bool
+    # HEAD has commits the remote branch lacks
+    unpushed: bool
+    # read from the local remote-tracking ref, without asking the remote; it can be stale
+    local: bool
+
+    @property
+    def needs_push(self) -> bool:
+        return not self.exists or self.unpushed
+
 
 class GitClient:
-    def __init__(self):
-        self._repo_root = None
+    def __init__(self, path: str | None = None):
+        self._path = path
+        self._repo_root: str | None = None
+        self._base_refs: dict[str, str | None] = {}
 
     def _get_repo_root(self) -> str:
         if self._repo_root is None:
@@ -16,6 +69,7 @@ class GitClient:
                 ["git", "rev-parse", "--show-toplevel"],
                 capture_output=True,
                 text=True,
+                cwd=self._path,
             )
             if result.returncode != 0:
                 raise click.ClickException("Not a git repository. Run this command from within a git repo.")
@@ -23,15 +77,24 @@ class GitClient:
         return self._repo_root
 
     def _run(
-        self, *args: str, check: bool = True, text: bool = True
+        self,
+        *args: str,
+        check: bool = True,
+        text: bool = True,
+        input: str | bytes | None = None,
+        git_options: tuple[str, ...] = (),
     ) -> subprocess.CompletedProcess:
+        # git_options go before the command, e.g. ("-c", "key=value")
         repo_root = self._get_repo_root()
-        result = subprocess.run(
-            ["git", *args],
-            capture_output=True,
-            text=text,
-            cwd=repo_root,
-        )
+        with span(f"git {args[0]}", argv=" ".join([*git_options, *args])) as attributes:
+            result = subprocess.run(
+                ["git", *git_options, *args],
+                capture_output=True,
+                text=text,
+                cwd=repo_root,
+                input=input,
+            )
+            attributes["returncode"] = result.returncode
         if check and result.returncode != 0:
             stderr = (
                 result.stderr
@@ -41,6 +104,18 @@ class GitClient:
             raise click.ClickException(f"git {' '.join(args)} failed: {stderr.strip()}")
         return result
 
+    def get_repo_root(self) -> str:
+        return self._get_repo_root()
+
+    def get_hooks_dir(self) -> str:
+        result = self._run("rev-parse", "--git-path", "hooks")
+        return os.path.join(self._get_repo_root(), result.stdout.strip())
+
+    def get_index_fingerprint(self) -> str:
+        head = self._run("rev-parse", "--verify", "--quiet", "HEAD", check=False).stdout.strip()
+        tree = self._run("write-tree").stdout.strip()
+        return f"{head}:{tree}"
+
     def get_current_branch(self) -> str:
         result = self._run("branch", "--show-current")
         return result.stdout.strip()
@@ -61,62 +136,101 @@ class GitClient:
         return renamed_files
 
     def get_modified_files(self) -> list[str]:
-        files = []
-        result = self._run("diff", "--name-only", check=False)
-        if result.returncode == 0:
-            files.extend([f for f in result.stdout.strip().split("\n") if f])
-        result = self._run("ls-files", "--others", "--exclude-standard", check=False)
-        if result.returncode == 0:
-            files.extend([f for f in result.stdout.strip().split("\n") if f])
-        return files
+        # changed and untracked files in one work tree walk; the untracked cache lets git skip directories whose
+        # mtime has not changed since the last scan, and a configured core.fsmonitor skips unchanged files
+        result = self._run(
+            "status",
+            "--porcelain=v2",
+            "-z",
+            "--untracked-files=all",
+            "--no-renames",
+            "--ignore-submodules=dirty",
+            check=False,
+            git_options=("-c", "core.untrackedCache=true"),
+        )
+        return parse_status(result.stdout) if result.returncode == 0 else []
 
     def stage_files(self, files: list[str]) -> None:
+        # paths go through stdin, so thousands of them do not hit ARG_MAX; unlike git add with pathspecs, which
+        # matches every index entry against every pathspec, update-index takes each path as is
         if files:
-            self._run("add", "--", *files)
+            self._run("update-index", "--add", "--remove", "-z", "--stdin", input="\0".join(files) + "\0")
 
-    def get_staged_diff(self) -> str:
-        result = self._run("diff", "--cached")
+    def get_staged_diff(self, *options: str) -> str:
+        result = self._run("diff", "--cached", *options)
         return result.stdout
 
     def get_staged_diff_stat(self) -> str:
         result = self._run("diff", "--cached", "--stat")
         return result.stdout
 
-    def get_file_content_from_index(self, file: str) -> str | None:
-        result = self._run("cat-file", "-e", f":{file}", check=False)
-        if result.returncode != 0:
-            return None
-        result = self._run("show", f":{file}")
-        return result.stdout
+    def get_staged_numstat(self) -> dict[str, tuple[int, int] | None]:
+        return parse_numstat(self._run("diff", "--cached", "--numstat", "-z").stdout)
 
-    def get_file_content_from_head(self, file: str) -> str | None:
-        result = self._run("cat-file", "-e", f"HEAD:{file}", check=False)
-        if result.returncode != 0:
-            return None
-        result = self._run("show", f"HEAD:{file}", text=False)
-        if b"\x00" in result.stdout:
-            return None
-        try:
-            return result.stdout.decode("utf-8")
-        except UnicodeDecodeError:
-            return None
+    def get_object_info(self, specs: list[str]) -> list[tuple[str, int] | None]:
+        # (blob sha, size) for each "<rev>:<path>" spec, None where the object is missing or not a blob
+        if not specs:
+            return []
+        result = self._run("cat-file", "--batch-check", input="".join(f"{spec}\n" for spec in specs))
+        info: list[tuple[str, int] | None] = []
+        for line in result.stdout.splitlines():
+            sha, _, rest = line.partition(" ")
+            kind, _, size = rest.partition(" ")
+            info.append((sha, int(size)) if kind == "blob" else None)
+        return info
+
+    def get_attributes(
+        self, files: list[str], attributes: list[str], cached: bool = False
+    ) -> dict[str, dict[str, str]]:
+        if not files:
+            return {}
+        options = ["--cached"] if cached else []
+        result = self._run("check-attr", "-z", "--stdin", *options, *attributes, input="\0".join(files) + "\0")
+        values: dict[str, dict[str, str]] = {}
+        fields = result.stdout.split("\0")
+        for path, attribute, value in zip(fields[0::3], fields[1::3], fields[2::3], strict=False):
+            values.setdefault(path, {})[attribute] = value
+        return values
+
+    def read_blobs(self, shas: list[str]) -> dict[str, bytes]:
+        if not shas:
+            return {}
+        output = self._run("cat-file", "--batch", input="".join(f"{sha}\n" for sha in shas).encode(), text=False).stdout
+        blobs: dict[str, bytes] = {}
+        position = 0
+        while position < len(output):
+            header_end = output.index(b"\n", position)
+            header = output[position:header_end].decode().split(" ")
+            position = header_end + 1
+            # "<sha> <type> <size>", or "<sha> missing" with no content
+            if len(header) == 3:
+                size = int(header[2])
+                blobs[header[0]] = output[position : position + size]
+                position += size + 1
+        return blobs
 
     def _get_base_ref(self, base: str = "main") -> str | None:
-        for ref in [f"origin/{base}", base, "origin/master", "master"]:
-            result = self._run("rev-parse", "--verify", ref, check=False)
-            if result.returncode == 0:
-                return ref
-        return None
+        # every branch query needs it, so it is resolved once per client
+        if base not in self._base_refs:
+            self._base_refs[base] = next(
+                (
+                    ref
+                    for ref in [f"origin/{base}", base, "origin/master", "master"]
+                    if self._run("rev-parse", "--verify", "--quiet", ref, check=False).returncode == 0
+                ),
+                None,
+            )
+        return self._base_refs[base]
 
-    def get_branch_diff(self, base: str = "main") -> str:
+    def get_branch_diff(self, base: str = "main", *options: str) -> str:
         base_ref = self._get_base_ref(base)
         logger.debug(f"get_branch_diff: base={base}, base_ref={base_ref}")
         if base_ref:
-            result = self._run("diff", f"{base_ref}...HEAD", check=False)
+            result = self._run("diff", f"{base_ref}...HEAD", *options, check=False)
             logger.debug(f"diff {base_ref}...HEAD returned {len(result.stdout)} chars")
             if result.returncode == 0:
                 return result.stdout
-        result = self._run("diff", "--root", "HEAD", check=False)
+        result = self._run("diff", "--root", "HEAD", *options, check=False)
         return result.stdout if result.returncode == 0 else ""
 
     def get_branch_diff_stat(self, base: str = "main") -> str:
@@ -128,6 +242,15 @@ class GitClient:
         result = self._run("diff", "--root", "HEAD", "--stat", check=False)
         return result.stdout if result.returncode == 0 else ""
 
+    def get_branch_numstat(self, base: str = "main") -> dict[str, tuple[int, int] | None]:
+        base_ref = self._get_base_ref(base)
+        if base_ref:
+            result = self._run("diff", f"{base_ref}...HEAD", "--numstat", "-z", check=False)
+            if result.returncode == 0:
+                return parse_numstat(result.stdout)
+        result = self._run("diff", "--root", "HEAD", "--numstat", "-z", check=False)
+        return parse_numstat(result.stdout) if result.returncode == 0 else {}
+
     def get_branch_commits(self, base: str = "main") -> str:
         base_ref = self._get_base_ref(base)
         if base_ref:
@@ -151,17 +274,6 @@ class GitClient:
                 renamed_files.add(parts[2])
         return renamed_files
 
-    def get_branch_changed_files(self, base: str = "main") -> list[str]:
-        base_ref = self._get_base_ref(base)
-        if base_ref:
-            result = self._run("diff", f"{base_ref}...HEAD", "--name-only", check=False)
-            if result.returncode == 0:
-                return [f for f in result.stdout.strip().split("\n") if f]
-        result = self._run("ls-tree", "-r", "--name-only", "HEAD", check=False)
-        if result.returncode == 0:
-            return [f for f in result.stdout.strip().split("\n") if f]
-        return []
-
     def commit(self, message: str) -> None:
         self._run("commit", "-m", message)
 
@@ -174,6 +286,37 @@ class GitClient:
         result = self._run("ls-remote", "--heads", "origin", branch, check=False)
         return bool(result.stdout.strip())
 
+    def get_remote_branch(self, branch: str) -> RemoteBranch:
+        # the local branch, its upstream and origin's tracking ref in one for-each-ref; the network is only asked
+        # when there is no tracking ref to go by
+        local_ref, tracking_ref = f"refs/heads/{branch}", f"refs/remotes/origin/{branch}"
+        result = self._run(
+            "for-each-ref",
+            "--format=%(refname)%00%(objectname)%00%(upstream)%00%(upstream:track,nobracket)",
+            local_ref,
+            tracking_ref,
+            check=False,
+        )
+        refs = {fields[0]: fields[1:] for line in result.stdout.splitlines() if len(fields := line.split("\0")) == 4}
+        head, upstream, track = refs.get(local_ref, ["", "", ""])
+        if tracking_ref in refs:
+            if refs[tracking_ref][0] == head:
+                return RemoteBranch(True, False, True)
+            if upstream == tracking_ref:
+                return RemoteBranch(True, "ahead" in track, True)
+            return RemoteBranch(True, self.has_unpushed_commits(branch), True)
+        if upstream == tracking_ref and track == "gone":
+            return RemoteBranch(False, True, True)
+
+        logger.debug(f"No tracking ref for {branch}, asking origin")
+        result = self._run("ls-remote", "--heads", "origin", local_ref, check=False)
+        remote_head = result.stdout.partition("\t")[0].strip()
+        if not remote_head:
+            return RemoteBranch(False, True, False)
+        # HEAD is behind or at the remote branch when it is an ancestor; an unknown commit counts as unpushed
+        behind = self._run("merge-base", "--is-ancestor", "HEAD", remote_head, check=False).returncode == 0
+        return RemoteBranch(True, not behind, False)
+
     def has_unpushed_commits(self, branch: str) -> bool:
         result = self._run("rev-list", f"origin/{branch}..HEAD", "--count", check=False)
         if result.returncode != 0:
@@ -191,3 +334,7 @@ class GitClient:
         if match:
             return match.group(1).rstrip("/")
         return None
+
+    def get_repo_name(self) -> str:
+        # "owner/name" for a GitHub remote, else the directory name; the key usage is recorded under
+        return self.get_remote_repo() or os.path.basename(self.get_repo_root())
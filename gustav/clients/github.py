@@ -1,4 +1,5 @@
-from collections import defaultdict
+import time
+from collections.abc import Iterator
 from datetime import datetime
 
 import click
@@ -6,10 +7,33 @@ import httpx
 from loguru import logger
 from rich.console import Console
 
+from gustav import pr_index
+from gustav.clients.http import get_http_client
+from gustav.pr_index import PullEntry
+from gustav.raw_data import RawDataWriter
+from gustav.records import CommitRecord, EventRecord, group_activity, parse_commit, parse_event
 from gustav.settings import GitHubSettings
+from gustav.tracing import span
 
 console = Console()
 
+# a default branch confirmed this recently is used without asking GitHub; older ones are revalidated by ETag
+DEFAULT_BRANCH_TTL = 24 * 3600
+# likewise for the open PR of a branch, kept short because others can close, retitle or push to it
+PULL_TTL = 10 * 60
+
+
+def to_pull_entry(pr: dict, etag: str | None) -> PullEntry:
+    return PullEntry(
+        pr["number"],
+        pr.get("html_url", ""),
+        pr.get("title") or "",
+        pr.get("body") or "",
+        (pr.get("head") or {}).get("sha", ""),
+        etag,
+        time.time(),
+    )
+
 
 class GitHubClient:
     def __init__(self, settings: GitHubSettings):
@@ -26,27 +50,30 @@ class GitHubClient:
         endpoint: str,
         json: dict | None = None,
         params: dict | None = None,
+        headers: dict | None = None,
     ) -> httpx.Response:
         url = f"{self.settings.api_url}/{endpoint.lstrip('/')}"
         logger.debug(f"GitHub API: {method} {url}")
         if json:
             logger.debug(f"Request body: {json}")
-        response = httpx.request(
-            method,
-            url,
-            headers=self.headers,
-            json=json,
-            params=params,
-            timeout=30,
-            follow_redirects=True,
-        )
+        with span(f"github {method}", endpoint=endpoint, page=(params or {}).get("page", 1)) as attributes:
+            response = get_http_client().request(
+                method,
+                url,
+                headers={**self.headers, **headers} if headers else self.headers,
+                json=json,
+                params=params,
+                timeout=30,
+                follow_redirects=True,
+            )
+            attributes["status"] = response.status_code
+            attributes["bytes"] = len(response.content)
         logger.debug(f"Response: {response.status_code}")
         if response.status_code >= 400:
             logger.error(f"GitHub API error: {response.status_code} - {response.text}")
         return response
 
-    def _get_paginated(self, endpoint: str, params: dict | None = None, max_pages: int | None = None) -> list:
-        results = []
+    def _iter_paginated(self, endpoint: str, params: dict | None = None, max_pages: int | None = None) -> Iterator:
         params = params.copy() if params else {}
         params["per_page"] = 100
         page = 1
@@ -64,15 +91,34 @@ class GitHubClient:
             if isinstance(data, list):
                 if not data:
                     break
-                results.extend(data)
+                yield from data
                 page += 1
             else:
-                results.append(data)
+                yield data
                 break
 
-        return results
+    def _get_paginated(self, endpoint: str, params: dict | None = None, max_pages: int | None = None) -> list:
+        return list(self._iter_paginated(endpoint, params=params, max_pages=max_pages))
 
     def get_pr(self, repo: str, branch: str) -> dict | None:
+        # a PR confirmed within PULL_TTL is used as is; an older one is revalidated by number with If-None-Match (a
+        # 304 does not count against the rate limit); the search by head branch only runs for new branches and once
+        # the indexed PR is closed
+        if entry := pr_index.get_pull(repo, branch):
+            if time.time() - entry.checked < PULL_TTL:
+                return entry.as_pr()
+            headers = {"If-None-Match": entry.etag} if entry.etag else None
+            response = self._request("GET", f"repos/{repo}/pulls/{entry.number}", headers=headers)
+            if response.status_code == 304:
+                pr_index.set_pull(repo, branch, entry._replace(checked=time.time()))
+                return entry.as_pr()
+            if response.status_code == 200 and response.json().get("state", "open") == "open":
+                entry = to_pull_entry(response.json(), response.headers.get("ETag"))
+                pr_index.set_pull(repo, branch, entry)
+                return entry.as_pr()
+            logger.debug(f"PR #{entry.number} of {branch} is no longer open")
+            pr_index.forget_pull(repo, branch)
+
         owner = repo.split("/")[0]
         response = self._request(
             "GET",
@@ -86,13 +132,10 @@ class GitHubClient:
         if not prs:
             return None
 
-        pr = prs[0]
-        return {
-            "number": pr["number"],
-            "title": pr.get("title", ""),
-            "body": pr.get("body", ""),
-            "url": pr.get("html_url", ""),
-        }
+        # the listing's ETag is not the PR's, so the first revalidation is a full GET
+        entry = to_pull_entry(prs[0], None)
+        pr_index.set_pull(repo, branch, entry)
+        return entry.as_pr()
 
     def create_pr(self, repo: str, branch: str, title: str, body: str, base: str = "main") -> str:
         response = self._request(
@@ -122,6 +165,7 @@ class GitHubClient:
             error = error_data.get("message", response.text)
             raise click.ClickException(f"Failed to create PR: {error}")
 
+        pr_index.set_pull(repo, branch, to_pull_entry(response.json(), None))
         return response.json().get("html_url", "")
 
     def update_pr(self, repo: str, pr_number: int, title: str, body: str) -> None:
@@ -139,16 +183,28 @@ class GitHubClient:
         if response.status_code != 200:
             error = response.json().get("message", response.text)
             raise click.ClickException(f"Failed to edit PR: {error}")
+        if branch := (response.json().get("head") or {}).get("ref"):
+            pr_index.set_pull(repo, branch, to_pull_entry(response.json(), None))
 
     def get_default_branch(self, repo: str) -> str:
-        response = self._request("GET", f"repos/{repo}")
+        cached = pr_index.get_repo(repo)
+        if cached and time.time() - cached.checked < DEFAULT_BRANCH_TTL:
+            return cached.default_branch
+
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else None
+        response = self._request("GET", f"repos/{repo}", headers=headers)
+        if response.status_code == 304 and cached:
+            pr_index.set_repo(repo, cached.default_branch, cached.etag)
+            return cached.default_branch
         if response.status_code == 404:
             raise click.ClickException(
                 f"Repository '{repo}' not found. Check that your GitHub token has access to this repo."
             )
         if response.status_code != 200:
             return "main"
-        return response.json().get("default_branch", "main")
+        default_branch = response.json().get("default_branch", "main")
+        pr_index.set_repo(repo, default_branch, response.headers.get("ETag"))
+        return default_branch
 
     def get_branches(self, repo: str) -> list[str]:
         branches_data = self._get_paginated(f"repos/{repo}/branches")
@@ -175,115 +231,111 @@ class GitHubClient:
         orgs_data = self._get_paginated("user/orgs")
         return [org.get("login", "") for org in orgs_data if org.get("login")]
 
-    def get_user_events(self, username: str, since: datetime) -> list[dict]:
-        events = self._get_paginated(f"users/{username}/events", max_pages=10)
-        logger.debug(f"Fetched {len(events)} total events for {username}")
-
-        filtered = [
-            event
-            for event in events
-            if event.get("created_at")
-            and datetime.strptime(event["created_at"][:10], "%Y-%m-%d") >= since
-        ]
+    def get_user_events(
+        self,
+        username: str,
+        since: datetime,
+        after_id: str | None = None,
+        raw_writer: RawDataWriter | None = None,
+    ) -> list[EventRecord]:
+        # events come newest first, so stop at the first one that is too old or already seen
+        events: list[EventRecord] = []
+        for event in self._iter_paginated(f"users/{username}/events", max_pages=10):
+            if after_id and int(event.get("id") or 0) <= int(after_id):
+                break
+            if not event.get("created_at"):
+                continue
+            if datetime.strptime(event["created_at"][:10], "%Y-%m-%d") < since:
+                break
+            if raw_writer:
+                raw_writer.write("event", event)
+            record = parse_event(event)
+            if record:
+                events.append(record)
 
-        logger.debug(f"Filtered to {len(filtered)} events since {since.strftime('%Y-%m-%d')}")
-        return filtered
+        logger.debug(f"Fetched {len(events)} events for {username} since {since.strftime('%Y-%m-%d')}")
+        return events
 
     def get_org_repos(self, org: str) -> list[str]:
         repos = self._get_paginated(f"orgs/{org}/repos", params={"type": "all"})
         return [r.get("full_name", "") for r in repos if r.get("full_name")]
 
-    def get_repo_commits(self, repo: str, author: str, since: datetime) -> list[dict]:
-        params = {"author": author, "since": since.strftime("%Y-%m-%dT00:00:00Z")}
-        return self._get_paginated(f"repos/{repo}/commits", params=params)
+    def get_org_repo_index(
+        self, org: str, etag: str | None = None, pushed_after: str | None = None
+    ) -> tuple[list[dict] | None, str | None]:
+        # sorted by push time, so an incremental refresh stops at the first repo not pushed since the last one;
+        # returns None for the repos when the listing is unchanged (304 on the first page)
+        params = {"type": "all", "sort": "pushed", "direction": "desc", "per_page": 100}
+        repos: list[dict] = []
+        new_etag = None
+        page = 1
+
+        while True:
+            params["page"] = page
+            headers = {"If-None-Match": etag} if etag and page == 1 else None
+            response = self._request("GET", f"orgs/{org}/repos", params=params, headers=headers)
+            if response.status_code == 304:
+                logger.debug(f"Repo listing for {org} unchanged")
+                return None, etag
+            if response.status_code != 200:
+                break
+            if page == 1:
+                new_etag = response.headers.get("ETag")
+
+            data = response.json()
+            if not data:
+                break
+            for repo in data:
+                if pushed_after and (repo.get("pushed_at") or "") < pushed_after:
+                    return repos, new_etag
+                repos.append(
+                    {
+                        "full_name": repo.get("full_name", ""),
+                        "pushed_at": repo.get("pushed_at"),
+                        "archived": bool(repo.get("archived")),
+                        "size": repo.get("size") or 0,
+                    }
+                )
+            page += 1
+
+        return repos, new_etag
+
+    def iter_repo_commits(
+        self, repo: str, author: str, since: datetime, raw_writer: RawDataWriter | None = None
+    ) -> Iterator[CommitRecord]:
+        params = {"author": author, "since": since.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        for commit in self._iter_paginated(f"repos/{repo}/commits", params=params):
+            if raw_writer:
+                raw_writer.write("commit", commit, repo=repo)
+            record = parse_commit(repo, commit)
+            if record:
+                yield record
 
     def fetch_org_commits(
-        self, org: str, username: str, since: datetime
-    ) -> tuple[dict[str, list[str]], dict[str, list[dict]]]:
+        self, org: str, username: str, since: datetime, raw_writer: RawDataWriter | None = None
+    ) -> list[CommitRecord]:
         logger.debug(f"Fetching repos from {org}")
         repos = self.get_org_repos(org)
         logger.debug(f"Found {len(repos)} repos in {org}")
 
-        commits_by_day: dict[str, list[str]] = defaultdict(list)
-        raw_commits_by_repo: dict[str, list[dict]] = {}
+        commits = [commit for repo in repos for commit in self.iter_repo_commits(repo, username, since, raw_writer)]
 
-        for repo in repos:
-            commits = self.get_repo_commits(repo, username, since)
-            if commits:
-                raw_commits_by_repo[repo] = commits
-            for commit in commits:
-                date_str = commit.get("commit", {}).get("author", {}).get("date", "")
-                message = commit.get("commit", {}).get("message", "").split("\n")[0]
-
-                if date_str:
-                    day = date_str.split("T")[0]
-                    commits_by_day[day].append(f"[{repo}] Pushed: {message}")
-
-        logger.debug(f"Found {sum(len(v) for v in commits_by_day.values())} commits in {org}")
-        return dict(commits_by_day), raw_commits_by_repo
+        logger.debug(f"Found {len(commits)} commits in {org}")
+        return commits
 
     def fetch_activity_by_day(
-        self, username: str, orgs: list[str], since: datetime
-    ) -> tuple[dict[str, list[str]], dict]:
-        activity_by_day: dict[str, list[str]] = defaultdict(list)
-        raw_data: dict = {"events": [], "org_commits": {}}
+        self, username: str, orgs: list[str], since: datetime, raw_writer: RawDataWriter | None = None
+    ) -> dict[str, list[str]]:
+        commits: list[CommitRecord] = []
 
         with console.status("[bold blue]Fetching activity from GitHub...") as status:
             status.update("[bold blue]Fetching personal events...")
-            events = self.get_user_events(username, since)
-            raw_data["events"] = events
+            events = self.get_user_events(username, since, raw_writer=raw_writer)
 
             for org in orgs:
                 status.update(f"[bold blue]Fetching commits from {org}...")
-                org_commits, raw_org_commits = self.fetch_org_commits(org, username, since)
-                for day, commits in org_commits.items():
-                    activity_by_day[day].extend(commits)
-                raw_data["org_commits"].update(raw_org_commits)
-
-            for event in events:
-                event_type = event.get("type", "")
-                repo_name = event.get("repo", {}).get("name", "")
-                created_at = event.get("created_at", "")
-                payload = event.get("payload", {})
-
-                if not created_at:
-                    continue
-
-                day = created_at.split("T")[0]
-
-                if event_type == "PushEvent":
-                    commits = payload.get("commits", [])
-                    for commit in commits:
-                        msg = commit.get("message", "").split("\n")[0]
-                        activity_by_day[day].append(f"[{repo_name}] Pushed: {msg}")
-
-                elif event_type == "PullRequestEvent":
-                    action = payload.get("action", "")
-                    pr = payload.get("pull_request", {})
-                    title = pr.get("title", "")
-                    activity_by_day[day].append(f"[{repo_name}] PR {action}: {title}")
-
-                elif event_type == "PullRequestReviewEvent":
-                    action = payload.get("action", "")
-                    pr = payload.get("pull_request", {})
-                    title = pr.get("title", "")
-                    activity_by_day[day].append(f"[{repo_name}] Reviewed PR: {title}")
-
-                elif event_type == "IssueCommentEvent":
-                    issue = payload.get("issue", {})
-                    title = issue.get("title", "")
-                    activity_by_day[day].append(f"[{repo_name}] Commented on: {title}")
-
-                elif event_type == "IssuesEvent":
-                    action = payload.get("action", "")
-                    issue = payload.get("issue", {})
-                    title = issue.get("title", "")
-                    activity_by_day[day].append(f"[{repo_name}] Issue {action}: {title}")
-
-                elif event_type == "CreateEvent":
-                    ref_type = payload.get("ref_type", "")
-                    ref = payload.get("ref", "")
-                    if ref:
-                        activity_by_day[day].append(f"[{repo_name}] Created {ref_type}: {ref}")
-
-        return dict(activity_by_day), raw_data
+                commits.extend(self.fetch_org_commits(org, username, since, raw_writer))
+
+        activity = group_activity(commits, events)
+        logger.debug(f"Removed {activity.duplicates} duplicate commits")
+        return activity.by_day
@@ -0,0 +1,10 @@
+from functools import cache
+
+import httpx
+
+KEEPALIVE_EXPIRY = 60
+
+
+@cache
+def get_http_client() -> httpx.Client:
+    return httpx.Client(limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY))
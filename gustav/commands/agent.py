@@ -0,0 +1,47 @@
+import click
+from rich.console import Console
+
+from gustav.agent import AGENT_SOCKET, DEFAULT_IDLE_TIMEOUT, agent_running, run_agent, start_agent, stop_agent
+
+console = Console()
+
+
+@click.group()
+def agent():
+    """Manage the in-memory credential agent"""
+
+
+@agent.command()
+@click.option("--timeout", "-t", default=DEFAULT_IDLE_TIMEOUT, help="Shut down after this many idle seconds")
+def start(timeout: int):
+    """Start the credential agent in the background"""
+    if agent_running():
+        console.print(f"[dim]Agent already running on {AGENT_SOCKET}[/dim]")
+        return
+    if not start_agent(timeout):
+        raise click.ClickException("Agent failed to start. See the log for details.")
+    console.print(f"[green]Agent started on {AGENT_SOCKET}[/green]")
+
+
+@agent.command()
+def stop():
+    """Stop the credential agent"""
+    if not stop_agent():
+        console.print("[dim]Agent is not running.[/dim]")
+        return
+    console.print("[green]Agent stopped.[/green]")
+
+
+@agent.command()
+def status():
+    """Show whether the credential agent is running"""
+    if agent_running():
+        console.print(f"[green]Running[/green] ({AGENT_SOCKET})")
+    else:
+        console.print("[dim]Not running[/dim]")
+
+
+@agent.command(hidden=True)
+@click.option("--timeout", "-t", default=DEFAULT_IDLE_TIMEOUT)
+def run(timeout: int):
+    run_agent(timeout)
@@ -1,8 +1,10 @@
 import click
 from rich.console import Console
 
+from gustav.blob_cache import count_summaries
 from gustav.cache import clear_cache
-from gustav.settings import CACHE_DIR
+from gustav.paths import CACHE_DIR
+from gustav.pr_index import count_pulls
 
 console = Console()
 
@@ -21,9 +23,13 @@ def cache(clear: bool):
         return
 
     cache_files = list(CACHE_DIR.glob("*.json"))
-    if not cache_files:
+    summaries = count_summaries()
+    pulls = count_pulls()
+    if not cache_files and not summaries and not pulls:
         console.print("[dim]Cache is empty.[/dim]")
         return
 
     console.print(f"[dim]Cache location:[/dim] {CACHE_DIR}")
     console.print(f"[dim]Cached entries:[/dim] {len(cache_files)}")
+    console.print(f"[dim]File summaries:[/dim] {summaries}")
+    console.print(f"[dim]Indexed PRs:[/dim] {pulls}")
@@ -1,5 +1,9 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import click
-from prompt_toolkit import prompt as pt_prompt
+from loguru import logger
 from rich.console import Console, Group
 from rich.live import Live
 from rich.panel import Panel
@@ -7,109 +11,166 @@ from rich.prompt import Prompt
 from rich.spinner import Spinner
 
 from gustav.cache import get_cache_key, get_cached, set_cached
-from gustav.clients.claude import ClaudeClient
+from gustav.changed_files import ChangedFile, build_files_content, classify_files, get_diff_omissions
+from gustav.clients.claude import ClaudeClient, Message
 from gustav.clients.git import GitClient
-from gustav.prompts.loader import load_prompt
-from gustav.settings import Settings
+from gustav.diff import CompactDiff, compact_diff, diff_options
+from gustav.output import Timings, emit_json
+from gustav.prewarm import PREWARM_SKIP_ENV, is_warming, wait_for_prewarm
+from gustav.prompts.loader import RenderedPrompt, Segments, get_template, load_prompt
+from gustav.settings import FilesSettings, Settings
+from gustav.usage import set_repo
 
 console = Console()
 
 PANEL_TITLE = "Commit Message"
 
+# the extra constraint behind each alternative message, in the order they are generated
+COMMIT_STYLES = [
+    "Use a broader scope that names the area of the codebase rather than a single module",
+    "Be more specific: name the exact function, option or behavior that changed",
+    "Keep the description under 50 characters",
+    "Describe the change from the user's point of view rather than the code's",
+]
+
 
 def build_loading_panel(status: str) -> Panel:
     content = Group(Spinner("dots", text=f" {status}", style="bold blue"))
     return Panel(content, title=PANEL_TITLE, border_style="cyan")
 
 
-def build_commit_prompt(diff_stat: str, diff: str, files_content: str) -> str:
-    return load_prompt("commit_message", diff_stat=diff_stat, diff=diff, files_content=files_content)
+def build_commit_prompt(diff_stat: str, diff: str, files_content: Segments, style: str = "") -> RenderedPrompt:
+    return load_prompt(
+        "commit_message",
+        diff_stat=diff_stat,
+        diff=diff,
+        files_content=files_content,
+        style=f"\n- {style}" if style else "",
+    )
 
 
-def generate_commit_message_cached(claude: ClaudeClient, diff_stat: str, diff: str, files_content: str) -> str:
-    cache_key = get_cache_key("commit", diff_stat, diff)
-    cached = get_cached(cache_key)
+def get_commit_cache_key(diff_stat: str, diff: str) -> str:
+    return get_cache_key("commit", get_template("commit_message").hash, diff_stat, diff)
 
-    if cached:
-        console.print("[dim]Using cached result...[/dim]")
-        return cached["message"]
 
-    prompt = build_commit_prompt(diff_stat, diff, files_content)
-    messages: list[dict[str, str]] = [{"role": "user", "content": prompt}]
+def missing_styles(entry: dict, alternatives: int) -> list[str]:
+    # alternatives are cached by style, so a style that failed or was not asked for before is all that gets requested
+    produced = entry.get("alternatives", {})
+    return [style for style in COMMIT_STYLES[:alternatives] if style not in produced]
 
-    with Live(build_loading_panel("Generating..."), console=console, refresh_per_second=10, transient=True):
-        commit_msg = claude.chat(messages, "commit_message", max_tokens=256)
 
-    set_cached(cache_key, {"message": commit_msg})
-    return commit_msg
+def has_alternatives(cached: dict, alternatives: int) -> bool:
+    return not missing_styles(cached, alternatives)
 
 
-def collect_files_content(git: GitClient, files: list[str]) -> str:
-    renamed_files = git.get_staged_renames()
-    content_parts = []
-    for file in files:
-        if file in renamed_files:
-            continue
-        file_content = git.get_file_content_from_index(file)
-        if file_content is not None:
-            content_parts.append(f'<file path="{file}">\n{file_content}\n</file>')
-    return "\n\n".join(content_parts)
+def get_alternatives(entry: dict, alternatives: int) -> list[str]:
+    produced = entry.get("alternatives", {})
+    return [produced[style] for style in COMMIT_STYLES[:alternatives] if style in produced]
 
 
-@click.command()
-@click.option("--push", "-p", is_flag=True, help="Push after committing")
-@click.pass_obj
-def commit(settings: Settings, push: bool):
-    """Generate commit message and commit staged changes"""
-    claude = ClaudeClient(settings.anthropic)
-    git = GitClient()
+def generate_commit_message(
+    claude: ClaudeClient,
+    diff_stat: str,
+    diff: str,
+    files_content: Segments,
+    alternatives: int = 0,
+    cached: dict | None = None,
+) -> dict:
+    # the message and its alternatives are requested concurrently; a cached entry only gets what it is missing
+    entry = {"message": None, **(cached or {})}
+    entry["alternatives"] = dict(entry.get("alternatives", {}))
+    styles = missing_styles(entry, alternatives)
 
-    staged_files = git.get_staged_files()
+    def generate(style: str) -> str:
+        prompt = build_commit_prompt(diff_stat, diff, files_content, style)
+        messages: list[Message] = [{"role": "user", "content": prompt}]
+        return claude.chat(messages, "commit_alternative" if style else "commit_message", max_tokens=256)
 
-    if not staged_files:
-        modified_files = git.get_modified_files()
-        if not modified_files:
-            console.print("[yellow]No modified files to stage.[/yellow]")
-            return
+    if entry["message"] and not styles:
+        return entry
+    # the message is generated on this thread and the alternatives on workers, each in a copy of this context so
+    # usage rows keep the repo and trace spans keep their parent
+    with ThreadPoolExecutor(max_workers=max(len(styles), 1)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, generate, style) for style in styles]
+        if not entry["message"]:
+            entry["message"] = generate("")
+        for style, future in zip(styles, futures, strict=True):
+            try:
+                entry["alternatives"][style] = future.result()
+            except click.ClickException as e:
+                logger.debug(f"Alternative commit message failed: {e.message}")
+    set_cached(get_commit_cache_key(diff_stat, diff), entry)
+    return entry
 
-        console.print(f"[dim]Found {len(modified_files)} modified file(s):[/dim]")
-        for file in modified_files:
-            console.print(f"  [dim]- {file}[/dim]")
-        console.print()
 
-        choice = Prompt.ask("Stage these files?", choices=["y", "n"], default="y")
-        if choice != "y":
-            console.print("[dim]Cancelled.[/dim]")
-            return
+def generate_commit_message_cached(
+    claude: ClaudeClient, git: GitClient, diff_stat: str, diff: str, files_content: Segments, alternatives: int = 0
+) -> tuple[dict, bool]:
+    cache_key = get_commit_cache_key(diff_stat, diff)
+    cached = get_cached(cache_key)
 
-        git.stage_files(modified_files)
-        staged_files = git.get_staged_files()
+    if not cached and is_warming(git):
+        with Live(
+            build_loading_panel("Waiting for prewarm..."), console=console, refresh_per_second=10, transient=True
+        ):
+            wait_for_prewarm(git)
+        cached = get_cached(cache_key)
+
+    if cached is not None and has_alternatives(cached, alternatives):
+        console.print("[dim]Using cached result...[/dim]")
+        return cached, True
 
-    diff_stat = git.get_staged_diff_stat()
-    diff = git.get_staged_diff()
-    files_content = collect_files_content(git, staged_files)
+    status = "Generating..." if not cached else "Generating alternatives..."
+    with Live(build_loading_panel(status), console=console, refresh_per_second=10, transient=True):
+        return generate_commit_message(claude, diff_stat, diff, files_content, alternatives, cached), False
 
-    commit_msg = generate_commit_message_cached(claude, diff_stat, diff, files_content)
 
-    prompt = build_commit_prompt(diff_stat, diff, files_content)
-    messages: list[dict[str, str]] = [{"role": "user", "content": prompt}]
+def classify_staged_files(git: GitClient) -> list[ChangedFile]:
+    return classify_files(git, git.get_staged_numstat(), "", cached=True)
 
+
+def get_compacted_diff(git: GitClient, settings: Settings, files: list[ChangedFile]) -> CompactDiff:
+    diff = git.get_staged_diff(*diff_options(settings.diff))
+    return compact_diff(diff, settings.diff, get_diff_omissions(files, settings.files))
+
+
+def collect_files_content(
+    git: GitClient, files: list[ChangedFile], settings: FilesSettings, compacted: CompactDiff
+) -> Segments:
+    changed = compacted.changed if settings.commit_content == "outline" else None
+    return build_files_content(git, files, settings, skip=git.get_staged_renames(), changed=changed)
+
+
+def interactive_commit_loop(claude: ClaudeClient, candidates: list[str], messages: list[Message]) -> str | None:
+    index = 0
+    commit_msg = candidates[0]
     while True:
-        console.print(Panel(commit_msg, title=PANEL_TITLE, border_style="cyan"))
-        console.print("[dim](y) confirm  (n) cancel  (e) edit  (r) refine[/dim]")
+        title = f"{PANEL_TITLE} ({index + 1}/{len(candidates)})" if len(candidates) > 1 else PANEL_TITLE
+        console.print(Panel(commit_msg, title=title, border_style="cyan"))
+        choices = ["y", "n", "e", "r"]
+        if len(candidates) > 1:
+            choices.append("a")
+            console.print("[dim](y) confirm  (n) cancel  (e) edit  (r) refine  (a) next alternative[/dim]")
+        else:
+            console.print("[dim](y) confirm  (n) cancel  (e) edit  (r) refine[/dim]")
 
-        choice = Prompt.ask("Create commit?", choices=["y", "n", "e", "r"], default="y")
+        choice = Prompt.ask("Create commit?", choices=choices, default="y")
 
         if choice == "y":
-            break
+            return commit_msg
         elif choice == "n":
             console.print("[dim]Cancelled.[/dim]")
-            return
+            return None
         elif choice == "e":
+            from prompt_toolkit import prompt as pt_prompt
+
             edited_msg = pt_prompt("Edit message: ", default=commit_msg)
             if edited_msg:
                 commit_msg = edited_msg.strip()
-            break
+            return commit_msg
+        elif choice == "a":
+            index = (index + 1) % len(candidates)
+            commit_msg = candidates[index]
         elif choice == "r":
             feedback = Prompt.ask("[dim]How should I change it?[/dim]")
             if not feedback:
@@ -119,11 +180,101 @@ def commit(settings: Settings, push: bool):
             with Live(build_loading_panel("Refining..."), console=console, refresh_per_second=10, transient=True):
                 commit_msg = claude.chat(messages, "commit_refine", max_tokens=256)
 
-    git.commit(commit_msg)
+
+@click.command()
+@click.option("--push", "-p", is_flag=True, help="Push after committing")
+@click.option("--yes", "-y", is_flag=True, help="Stage and commit without asking")
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON (a dry run without --yes)")
+@click.option(
+    "--alternatives",
+    "-a",
+    type=click.IntRange(0, len(COMMIT_STYLES)),
+    default=None,
+    help="Also generate this many alternative messages (default: commit.alternatives)",
+)
+@click.pass_obj
+def commit(settings: Settings, push: bool, yes: bool, as_json: bool, alternatives: int | None):
+    """Generate commit message and commit staged changes"""
+    os.environ[PREWARM_SKIP_ENV] = "1"
+    console.quiet = as_json
+    claude = ClaudeClient(settings.anthropic)
+    git = GitClient()
+    set_repo(git.get_repo_name())
+    timings = Timings()
+    result: dict = {"message": None, "alternatives": [], "cached": False, "committed": False, "pushed": False}
+    if alternatives is None:
+        alternatives = settings.commit.alternatives
+
+    with timings.phase("collect"):
+        staged_files = git.get_staged_files()
+
+    if not staged_files:
+        modified_files = git.get_modified_files()
+        if not modified_files:
+            console.print("[yellow]No modified files to stage.[/yellow]")
+            if as_json:
+                emit_json({**result, "timings": timings.as_dict()})
+            return
+
+        if not yes:
+            if as_json:
+                raise click.ClickException("Nothing staged. Pass --yes to stage all modified files.")
+            console.print(f"[dim]Found {len(modified_files)} modified file(s):[/dim]")
+            for file in modified_files:
+                console.print(f"  [dim]- {file}[/dim]")
+            console.print()
+
+            choice = Prompt.ask("Stage these files?", choices=["y", "n"], default="y")
+            if choice != "y":
+                console.print("[dim]Cancelled.[/dim]")
+                return
+
+        with timings.phase("collect"):
+            git.stage_files(modified_files)
+            staged_files = git.get_staged_files()
+
+    with timings.phase("collect"):
+        diff_stat = git.get_staged_diff_stat()
+        files = classify_staged_files(git)
+        compacted = get_compacted_diff(git, settings, files)
+        diff = compacted.text
+        files_content = collect_files_content(git, files, settings.files, compacted)
+    result["diff_tokens"] = {"collected": compacted.tokens_collected, "compacted": compacted.tokens_compacted}
+    if compacted.tokens_compacted < compacted.tokens_collected:
+        console.print(
+            f"[dim]Diff compacted: ~{compacted.tokens_collected:,} -> ~{compacted.tokens_compacted:,} tokens[/dim]"
+        )
+
+    with timings.phase("generate"):
+        entry, result["cached"] = generate_commit_message_cached(
+            claude, git, diff_stat, diff, files_content, alternatives
+        )
+    commit_msg = entry["message"]
+    candidates = [commit_msg, *get_alternatives(entry, alternatives)]
+    result.update(message=commit_msg, alternatives=candidates[1:])
+
+    if not yes:
+        if as_json:
+            emit_json({**result, "timings": timings.as_dict()})
+            return
+        prompt = build_commit_prompt(diff_stat, diff, files_content)
+        messages: list[Message] = [{"role": "user", "content": prompt}]
+        accepted = interactive_commit_loop(claude, candidates, messages)
+        if accepted is None:
+            return
+        commit_msg = accepted
+
+    with timings.phase("commit"):
+        git.commit(commit_msg)
+    result.update(message=commit_msg, committed=True)
     console.print("[green]Committed.[/green]")
 
     if push:
         branch = git.get_current_branch()
-        with console.status(f"[bold blue]Pushing '{branch}'..."):
+        with timings.phase("push"), console.status(f"[bold blue]Pushing '{branch}'..."):
             git.push(branch)
+        result["pushed"] = True
         console.print(f"[green]Pushed '{branch}'.[/green]")
+
+    if as_json:
+        emit_json({**result, "timings": timings.as_dict()})
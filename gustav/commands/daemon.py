@@ -0,0 +1,47 @@
+import click
+from rich.console import Console
+
+from gustav.daemon import DAEMON_SOCKET, DEFAULT_IDLE_TIMEOUT, daemon_running, run_daemon, start_daemon, stop_daemon
+
+console = Console()
+
+
+@click.group()
+def daemon():
+    """Serve commit, pr and report from a warm background process"""
+
+
+@daemon.command()
+@click.option("--timeout", "-t", default=DEFAULT_IDLE_TIMEOUT, help="Shut down after this many idle seconds")
+def start(timeout: int):
+    """Start the daemon in the background"""
+    if daemon_running():
+        console.print(f"[dim]Daemon already running on {DAEMON_SOCKET}[/dim]")
+        return
+    if not start_daemon(timeout):
+        raise click.ClickException("Daemon failed to start. See the log for details.")
+    console.print(f"[green]Daemon started on {DAEMON_SOCKET}[/green]")
+
+
+@daemon.command()
+def stop():
+    """Stop the daemon"""
+    if not stop_daemon():
+        console.print("[dim]Daemon is not running.[/dim]")
+        return
+    console.print("[green]Daemon stopped.[/green]")
+
+
+@daemon.command()
+def status():
+    """Show whether the daemon is running"""
+    if daemon_running():
+        console.print(f"[green]Running[/green] ({DAEMON_SOCKET})")
+    else:
+        console.print("[dim]Not running[/dim]")
+
+
+@daemon.command(hidden=True)
+@click.option("--timeout", "-t", default=DEFAULT_IDLE_TIMEOUT)
+def run(timeout: int):
+    run_daemon(timeout)
@@ -0,0 +1,48 @@
+import os
+
+import click
+from rich.console import Console
+
+from gustav.clients.git import GitClient
+from gustav.prewarm import (
+    DEFAULT_DELAY,
+    PREWARM_SKIP_ENV,
+    install_hook,
+    run_worker,
+    schedule_prewarm,
+    uninstall_hook,
+)
+
+console = Console()
+
+
+@click.command()
+@click.option("--delay", "-d", default=DEFAULT_DELAY, help="Seconds to wait for the index to settle")
+@click.option("--install", is_flag=True, help="Install as the repository's post-index-change hook")
+@click.option("--uninstall", is_flag=True, help="Remove the hook installed by --install")
+@click.option("--worker", is_flag=True, hidden=True)
+def prewarm(delay: float, install: bool, uninstall: bool, worker: bool):
+    """Generate the commit message for staged changes in the background"""
+    if worker:
+        run_worker(delay)
+        return
+
+    git = GitClient()
+
+    if install:
+        hook = install_hook(git)
+        console.print(f"[green]Installed {hook}[/green]")
+        return
+
+    if uninstall:
+        removed = uninstall_hook(git)
+        if removed:
+            console.print(f"[green]Removed {removed}[/green]")
+        else:
+            console.print("[dim]No gus prewarm hook installed.[/dim]")
+        return
+
+    if os.environ.get(PREWARM_SKIP_ENV):
+        return
+
+    schedule_prewarm(git, delay)
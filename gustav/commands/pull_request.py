@@ -1,4 +1,7 @@
 import difflib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 import click
 from loguru import logger
@@ -11,14 +14,22 @@ from rich.spinner import Spinner
 from rich.text import Text
 
 from gustav.cache import get_cache_key, get_cached, set_cached
+from gustav.changed_files import build_files_content, classify_files, get_diff_omissions
 from gustav.clients.claude import ClaudeClient
-from gustav.clients.git import GitClient
+from gustav.clients.git import GitClient, RemoteBranch
 from gustav.clients.github import GitHubClient
-from gustav.prompts.loader import load_prompt
-from gustav.settings import Settings
+from gustav.diff import CompactDiff, compact_diff, diff_options
+from gustav.output import Timings, emit_json
+from gustav.prompts.loader import Segments, get_template, load_prompt
+from gustav.settings import DiffSettings, FilesSettings, Settings
+from gustav.usage import set_repo
 
 console = Console()
 
+BATCH_JOBS = 4
+# prompts whose templates are part of the PR cache key, so editing one invalidates cached descriptions
+PR_PROMPTS = ("pr_changes", "pr_summary", "pr_title")
+
 
 def is_similar(claude: ClaudeClient, old: str, new: str, context: str = "") -> bool:
     if old == new:
@@ -92,46 +103,84 @@ def build_loading_panel(panel_title: str, status: str) -> Panel:
     return Panel(content, title=panel_title, border_style="cyan")
 
 
-def generate_pr_content_cached(
+@dataclass(slots=True)
+class PrContent:
+    title: str
+    description: str
+    cached: bool = False
+    similar: bool = False
+
+
+def generate_pr_content(
     claude: ClaudeClient,
     commits: str,
     diff_stat: str,
     diff: str,
-    files_content: str,
+    files_content: Segments,
     existing_title: str | None,
     current_description: str | None,
-    panel_title: str,
-) -> tuple[str, str]:
-    cache_key = get_cache_key(commits, diff_stat, diff, current_description or "")
+    on_step: Callable[[str], None] | None = None,
+) -> PrContent:
+    templates = "".join(get_template(name).hash for name in PR_PROMPTS)
+    cache_key = get_cache_key(templates, commits, diff_stat, diff, current_description or "")
     cached = get_cached(cache_key)
-
     if cached:
-        console.print("[dim]Using cached result...[/dim]")
-        return cached["title"], cached["description"]
+        return PrContent(cached["title"], cached["description"], cached=True)
+
+    step = on_step or (lambda _: None)
+    step("Generating changes...")
+    changes = generate_pr_changes(claude, commits, diff_stat, diff, files_content)
+    step("Generating summary...")
+    summary = generate_pr_summary(claude, changes)
+    step("Generating title...")
+    title = generate_pr_title(claude, summary)
+
+    generated_description = build_full_description(summary, changes)
+
+    if current_description and existing_title:
+        step("Comparing with current description...")
+        if is_similar(claude, current_description, generated_description):
+            return PrContent(existing_title, current_description, similar=True)
 
+    set_cached(cache_key, {"title": title, "description": generated_description})
+    return PrContent(title, generated_description)
+
+
+def generate_pr_content_cached(
+    claude: ClaudeClient,
+    commits: str,
+    diff_stat: str,
+    diff: str,
+    files_content: Segments,
+    existing_title: str | None,
+    current_description: str | None,
+    panel_title: str,
+) -> PrContent:
     with Live(
         build_loading_panel(panel_title, "Generating changes..."),
         console=console,
         refresh_per_second=10,
         transient=True,
     ) as live:
-        changes = generate_pr_changes(claude, commits, diff_stat, diff, files_content)
-        live.update(build_loading_panel(panel_title, "Generating summary..."))
-        summary = generate_pr_summary(claude, changes)
-        live.update(build_loading_panel(panel_title, "Generating title..."))
-        title = generate_pr_title(claude, summary)
-
-    generated_description = build_full_description(summary, changes)
+        content = generate_pr_content(
+            claude,
+            commits,
+            diff_stat,
+            diff,
+            files_content,
+            existing_title,
+            current_description,
+            on_step=lambda status: live.update(build_loading_panel(panel_title, status)),
+        )
 
-    if current_description and existing_title and is_similar(claude, current_description, generated_description):
+    if content.cached:
+        console.print("[dim]Using cached result...[/dim]")
+    elif content.similar:
         console.print("[dim]Description similar.[/dim]")
-        return existing_title, current_description
-
-    set_cached(cache_key, {"title": title, "description": generated_description})
-    return title, generated_description
+    return content
 
 
-def generate_pr_changes(claude: ClaudeClient, commits: str, diff_stat: str, diff: str, files_content: str) -> str:
+def generate_pr_changes(claude: ClaudeClient, commits: str, diff_stat: str, diff: str, files_content: Segments) -> str:
     prompt = load_prompt("pr_changes", commits=commits, diff_stat=diff_stat, diff=diff, files_content=files_content)
     return claude.ask(prompt, "pr_changes", max_tokens=512).strip()
 
@@ -219,80 +268,128 @@ def interactive_pr_loop(
                 no_changes = False
 
 
-def collect_files_content(git: GitClient, files: list[str], renamed_files: set[str]) -> str:
-    content_parts = []
-    for file in files:
-        if file in renamed_files:
-            continue
-        file_content = git.get_file_content_from_head(file)
-        if file_content is not None:
-            content_parts.append(f'<file path="{file}">\n{file_content}\n</file>')
-    return "\n\n".join(content_parts)
+def collect_branch_changes(
+    git: GitClient, base_branch: str, diff_settings: DiffSettings, files_settings: FilesSettings
+) -> tuple[CompactDiff, Segments]:
+    files = classify_files(git, git.get_branch_numstat(base_branch), "HEAD")
+    diff = git.get_branch_diff(base_branch, *diff_options(diff_settings))
+    compacted = compact_diff(diff, diff_settings, get_diff_omissions(files, files_settings))
+    changed = compacted.changed if files_settings.pr_content == "outline" else None
+    renamed = git.get_branch_renames(base_branch)
+    files_content = build_files_content(git, files, files_settings, skip=renamed, changed=changed)
+    return compacted, files_content
+
+
+def is_missing_on_remote(git: GitClient, branch: str, remote: RemoteBranch, pr_data: dict | None) -> bool:
+    # a tracking ref outlives a remote branch deleted after its PR was merged, so before a PR is created the local
+    # view is checked against origin
+    return remote.local and not remote.needs_push and not pr_data and not git.branch_exists_on_remote(branch)
 
 
 @click.command()
+@click.argument("paths", nargs=-1)
+@click.option("--all", "batch", is_flag=True, help="Create or update PRs in every repo in PATHS (paths or globs)")
+@click.option("--yes", "-y", is_flag=True, help="Create or update without review")
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON (a dry run without --yes)")
+@click.option("--jobs", "-j", default=BATCH_JOBS, show_default=True, help="With --all, PRs generated at once")
 @click.pass_obj
-def pull_request(settings: Settings):
+def pull_request(settings: Settings, paths: tuple[str, ...], batch: bool, yes: bool, as_json: bool, jobs: int):
     """Create or update pull request"""
+    console.quiet = as_json
     claude = ClaudeClient(settings.anthropic)
-    git = GitClient()
     github = GitHubClient(settings.github)
 
-    branch = git.get_current_branch()
-    repo = git.get_remote_repo()
-    if not repo:
-        raise click.ClickException("Could not determine repository from git remote")
+    if paths and not batch:
+        raise click.ClickException("Repo paths are only used with --all.")
+    if batch:
+        from gustav.pr_batch import run_batch
+
+        run_batch(claude, github, settings, paths, max(jobs, 1), yes, as_json)
+        return
 
-    base_branch = github.get_default_branch(repo)
+    git = GitClient()
+    timings = Timings()
+
+    with timings.phase("lookup"):
+        branch = git.get_current_branch()
+        repo = git.get_remote_repo()
+        if not repo:
+            raise click.ClickException("Could not determine repository from git remote")
+        set_repo(repo)
+
+        base_branch = github.get_default_branch(repo)
 
     if branch == base_branch:
         raise click.ClickException(f"Create a feature branch first. You're on '{base_branch}'.")
 
-    needs_push = not git.branch_exists_on_remote(branch) or git.has_unpushed_commits(branch)
-    if needs_push:
-        with console.status(f"[bold blue]Pushing '{branch}'..."):
-            git.push(branch)
-        console.print(f"[green]Pushed '{branch}'.[/green]")
-
-    pr_data = github.get_pr(repo, branch)
-
-    commits = git.get_branch_commits(base_branch)
-    diff_stat = git.get_branch_diff_stat(base_branch)
-    diff = git.get_branch_diff(base_branch)
-    changed_files = git.get_branch_changed_files(base_branch)
-    renamed_files = git.get_branch_renames(base_branch)
-    files_content = collect_files_content(git, changed_files, renamed_files)
-
-    if pr_data:
-        pr_number = pr_data["number"]
-        pr_url = pr_data.get("url", "")
-        existing_title = pr_data.get("title", "")
-        existing_body = pr_data.get("body", "") or ""
-        panel_title = f"Update Pull Request #{pr_number} - {pr_url}"
-
-        title, description = generate_pr_content_cached(
-            claude, commits, diff_stat, diff, files_content, existing_title, existing_body, panel_title
+    # a JSON run without --yes is a dry run, so it does not push either; the push and the PR lookup run together
+    remote = None
+    if yes or not as_json:
+        with timings.phase("push"):
+            remote = git.get_remote_branch(branch)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pushing = pool.submit(git.push, branch) if remote and remote.needs_push else None
+        with timings.phase("lookup"):
+            pr_data = github.get_pr(repo, branch)
+        with timings.phase("push"):
+            if remote and not pushing and is_missing_on_remote(git, branch, remote, pr_data):
+                pushing = pool.submit(git.push, branch)
+            if pushing:
+                with console.status(f"[bold blue]Pushing '{branch}'..."):
+                    pushing.result()
+                console.print(f"[green]Pushed '{branch}'.[/green]")
+
+    with timings.phase("collect"):
+        commits = git.get_branch_commits(base_branch)
+        diff_stat = git.get_branch_diff_stat(base_branch)
+        compacted, files_content = collect_branch_changes(git, base_branch, settings.diff, settings.files)
+        diff = compacted.text
+
+    if compacted.tokens_compacted < compacted.tokens_collected:
+        console.print(
+            f"[dim]Diff compacted: ~{compacted.tokens_collected:,} -> ~{compacted.tokens_compacted:,} tokens[/dim]"
         )
+    existing_title = pr_data.get("title", "") if pr_data else None
+    existing_body = (pr_data.get("body", "") or "") if pr_data else None
+    panel_title = (
+        f"Update Pull Request #{pr_data['number']} - {pr_data.get('url', '')}" if pr_data else "New Pull Request"
+    )
 
-        result = interactive_pr_loop(claude, title, description, panel_title, existing_title, existing_body)
-        if not result:
-            return
-
-        title, description = result
-        github.update_pr(repo, pr_number, title, description)
-        console.print(f"[green]PR #{pr_number} updated.[/green]")
-
+    with timings.phase("generate"):
+        content = generate_pr_content_cached(
+            claude, commits, diff_stat, diff, files_content, existing_title, existing_body, panel_title
+        )
+    result = {
+        "repo": repo,
+        "branch": branch,
+        "action": "update" if pr_data else "create",
+        "number": pr_data["number"] if pr_data else None,
+        "url": pr_data.get("url", "") if pr_data else None,
+        "title": content.title,
+        "description": content.description,
+        "cached": content.cached,
+        "similar": content.similar,
+        "applied": False,
+        "diff_tokens": {"collected": compacted.tokens_collected, "compacted": compacted.tokens_compacted},
+    }
+
+    if yes or as_json:
+        accepted = (content.title, content.description) if yes else None
     else:
-        panel_title = "New Pull Request"
-
-        title, description = generate_pr_content_cached(
-            claude, commits, diff_stat, diff, files_content, None, None, panel_title
+        accepted = interactive_pr_loop(
+            claude, content.title, content.description, panel_title, existing_title, existing_body
         )
 
-        result = interactive_pr_loop(claude, title, description, panel_title)
-        if not result:
-            return
-
-        title, description = result
-        pr_url = github.create_pr(repo, branch, title, description, base=base_branch)
-        console.print(f"[green]PR created: {pr_url}[/green]")
+    if accepted:
+        title, description = accepted
+        with timings.phase("apply"):
+            if pr_data:
+                github.update_pr(repo, pr_data["number"], title, description)
+                console.print(f"[green]PR #{pr_data['number']} updated.[/green]")
+            else:
+                result["url"] = github.create_pr(repo, branch, title, description, base=base_branch)
+                console.print(f"[green]PR created: {result['url']}[/green]")
+        result.update(title=title, description=description, applied=True)
+
+    if as_json:
+        emit_json({**result, "timings": timings.as_dict()})
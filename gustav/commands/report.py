@@ -1,24 +1,36 @@
 import csv
-import json
-from datetime import datetime, timedelta
+import hashlib
+from contextlib import nullcontext
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import click
+from loguru import logger
 from rich.console import Console, Group
 from rich.live import Live
 from rich.panel import Panel
 from rich.spinner import Spinner
 from rich.table import Table
 
+from gustav.activity_store import ActivityStore, Cursor
 from gustav.cache import get_cached, set_cached
 from gustav.clients.claude import ClaudeClient
 from gustav.clients.github import GitHubClient
+from gustav.output import Timings, emit_json
 from gustav.prompts.loader import load_prompt
-from gustav.settings import DATA_DIR, Settings
+from gustav.raw_data import RawDataWriter, get_raw_data_path
+from gustav.settings import Settings
 
 console = Console()
 
 PANEL_TITLE = "Report"
+CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# refetch a little before the high-water mark so commits pushed late with older dates are not missed
+CURSOR_OVERLAP = timedelta(days=1)
+# full org listings catch archived, renamed and deleted repos that a push-sorted incremental refresh cannot see
+REPO_INDEX_MAX_AGE = timedelta(days=7)
+# late pushes mostly land within a few days, so these are resynced on every run
+RECENT_DAYS = 3
 
 
 def build_loading_panel(status: str) -> Panel:
@@ -34,8 +46,13 @@ def get_cached_day(day: str, username: str) -> dict | None:
     return get_cached(get_day_cache_key(day, username))
 
 
-def cache_day(day: str, username: str, activity: list[str], summary: str) -> None:
-    set_cached(get_day_cache_key(day, username), {"activity": activity, "summary": summary})
+def cache_day(day: str, username: str, activity: list[str], summary: str, fingerprint: str) -> None:
+    set_cached(get_day_cache_key(day, username), {"activity": activity, "summary": summary, "fingerprint": fingerprint})
+
+
+def get_activity_fingerprint(activity: list[str]) -> str:
+    normalized = sorted({" ".join(line.split()) for line in activity})
+    return hashlib.sha256("\n".join(normalized).encode()).hexdigest()[:16]
 
 
 def generate_summary(claude: ClaudeClient, activity: list[str]) -> str:
@@ -44,81 +61,159 @@ def generate_summary(claude: ClaudeClient, activity: list[str]) -> str:
     return claude.ask(prompt, "report_summary")
 
 
-def save_raw_data(username: str, raw_data: dict) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = DATA_DIR / f"report_{username}.json"
-    output_path.write_text(json.dumps(raw_data, indent=2))
-    console.print(f"[dim]Raw data saved to {output_path}[/dim]")
+def cursor_covers(cursor: Cursor | None, since: datetime) -> bool:
+    return cursor is not None and cursor.since <= since.strftime(CURSOR_FORMAT)
+
+
+def advance_cursor(cursor: Cursor | None, since: datetime, high_water: str) -> Cursor:
+    if cursor and cursor_covers(cursor, since):
+        return Cursor(cursor.since, high_water)
+    return Cursor(since.strftime(CURSOR_FORMAT), high_water)
+
+
+def get_fetch_since(cursor: Cursor | None, since: datetime) -> datetime:
+    if cursor and cursor_covers(cursor, since):
+        return max(since, datetime.strptime(cursor.high_water, CURSOR_FORMAT) - CURSOR_OVERLAP)
+    return since
+
+
+def get_active_repos(github: GitHubClient, store: ActivityStore, org: str, since: datetime) -> list[str]:
+    now = datetime.now(UTC)
+    index = store.get_repo_index(org)
+    if index is None or index.refreshed_at < (now - REPO_INDEX_MAX_AGE).strftime(CURSOR_FORMAT):
+        full = True
+        repos, etag = github.get_org_repo_index(org)
+    else:
+        full = False
+        repos, etag = github.get_org_repo_index(org, etag=index.etag, pushed_after=index.pushed_high)
+    if repos is not None:
+        store.update_repo_index(org, repos, etag, now.strftime(CURSOR_FORMAT), full)
+
+    active = store.get_repos_pushed_since(org, since.strftime(CURSOR_FORMAT))
+    logger.debug(f"{org}: {len(active)} of {store.count_repos(org)} repos pushed since {since:%Y-%m-%d}")
+    return active
+
+
+def sync_activity(
+    github: GitHubClient,
+    store: ActivityStore,
+    username: str,
+    orgs: list[str],
+    since: datetime,
+    raw_writer: RawDataWriter | None = None,
+) -> None:
+    commit_count = 0
+    fetched_at = datetime.now(UTC).strftime(CURSOR_FORMAT)
+
+    with console.status("[bold blue]Fetching activity from GitHub...") as status:
+        status.update("[bold blue]Fetching personal events...")
+        scope = f"events:{username}"
+        cursor = store.get_cursor(scope)
+        after_id = cursor.high_water if cursor and cursor_covers(cursor, since) else None
+        events = github.get_user_events(username, since, after_id=after_id, raw_writer=raw_writer)
+        store.add_events(username, events)
+        newest_id = max((event.id for event in events), key=int, default=after_id or "0")
+        store.set_cursor(scope, advance_cursor(cursor, since, newest_id))
+
+        for org in orgs:
+            status.update(f"[bold blue]Fetching commits from {org}...")
+            for repo in get_active_repos(github, store, org, since):
+                scope = f"commits:{repo}:{username}"
+                cursor = store.get_cursor(scope)
+                commits = github.iter_repo_commits(repo, username, get_fetch_since(cursor, since), raw_writer)
+                commit_count += store.add_commits(username, commits)
+                store.set_cursor(scope, advance_cursor(cursor, since, fetched_at))
+
+    logger.debug(f"Synced {len(events)} events and {commit_count} commits for {username}")
 
 
 @click.command()
 @click.option("--days", "-d", default=7, help="Number of days to include in the report")
 @click.option("--csv", "csv_path", default=None, type=click.Path(), help="Export report to CSV file")
+@click.option("--raw", is_flag=True, help="Also save the raw GitHub responses as NDJSON")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON")
 @click.pass_obj
-def report(settings: Settings, days: int, csv_path: str | None):
+def report(settings: Settings, days: int, csv_path: str | None, raw: bool, as_json: bool):
     """Generate a daily work report from GitHub activity"""
+    console.quiet = as_json
+    timings = Timings()
     claude = ClaudeClient(settings.anthropic)
     github = GitHubClient(settings.github)
 
-    username = github.get_authenticated_user()
+    with timings.phase("sync"):
+        username = github.get_authenticated_user()
     console.print(f"[dim]Fetching activity for {username}...[/dim]")
 
-    today = datetime.now().strftime("%Y-%m-%d")
     target_days = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
-
-    cached_results: dict[str, dict] = {}
-    days_to_fetch: list[str] = []
-
-    for day in target_days:
-        if day == today:
-            days_to_fetch.append(day)
-        else:
-            cached = get_cached_day(day, username)
-            if cached:
-                cached_results[day] = cached
-            else:
-                days_to_fetch.append(day)
-
-    activity_by_day: dict[str, list[str]] = {}
-
-    if days_to_fetch:
-        earliest_day = min(days_to_fetch)
-        since = datetime.strptime(earliest_day, "%Y-%m-%d")
+    cached_days = {day: cached for day in target_days if (cached := get_cached_day(day, username))}
+
+    # older cached days are not resynced, but are still checked against what the store already holds
+    sync_from = min([*target_days[:RECENT_DAYS], *(day for day in target_days if day not in cached_days)])
+    raw_path = get_raw_data_path(username)
+    with (
+        timings.phase("sync"),
+        ActivityStore() as store,
+        RawDataWriter(raw_path) if raw else nullcontext() as raw_writer,
+    ):
         orgs = github.get_user_orgs()
-        fetched, raw_data = github.fetch_activity_by_day(username, orgs, since)
-        for day in days_to_fetch:
-            if day in fetched:
-                activity_by_day[day] = fetched[day]
-        save_raw_data(username, raw_data)
-
-    all_days = sorted(set(cached_results.keys()) | set(activity_by_day.keys()), reverse=True)
-
-    if not all_days:
-        console.print(f"[yellow]No activity found in the last {days} days.[/yellow]")
-        return
+        sync_activity(github, store, username, orgs, datetime.strptime(sync_from, "%Y-%m-%d"), raw_writer)
+        fetched = store.activity_by_day(username, min(target_days))
+    if fetched.duplicates:
+        console.print(f"[dim]Removed {fetched.duplicates} duplicate activity lines[/dim]")
+    if raw:
+        console.print(f"[dim]Raw data saved to {raw_path}[/dim]")
 
     rows: list[tuple[str, str, str]] = []
+    summarized: set[str] = set()
+
+    for day in target_days:
+        day_name = datetime.strptime(day, "%Y-%m-%d").strftime("%A")
+        activity = fetched.by_day.get(day, [])
+        cached = cached_days.get(day)
 
-    for day in all_days:
-        day_dt = datetime.strptime(day, "%Y-%m-%d")
-        day_name = day_dt.strftime("%A")
+        if not activity:
+            if cached:
+                rows.append((day, day_name, cached["summary"]))
+            continue
 
-        if day in cached_results:
-            summary = cached_results[day]["summary"]
+        fingerprint = get_activity_fingerprint(activity)
+        if cached and cached.get("fingerprint") == fingerprint:
+            summary = cached["summary"]
         else:
-            activity = activity_by_day.get(day, [])
-            if not activity:
-                continue
-
-            with Live(
-                build_loading_panel(f"Summarizing {day}..."), console=console, refresh_per_second=10, transient=True
+            with (
+                timings.phase("summarize"),
+                Live(
+                    build_loading_panel(f"Summarizing {day}..."),
+                    console=console,
+                    refresh_per_second=10,
+                    transient=True,
+                ),
             ):
                 summary = generate_summary(claude, activity)
-
-            cache_day(day, username, activity, summary)
+            cache_day(day, username, activity, summary, fingerprint)
+            summarized.add(day)
 
         rows.append((day, day_name, summary))
 
+    logger.debug(f"Summarized {len(summarized)} of {len(rows)} days, the rest were unchanged")
+
+    if as_json:
+        emit_json(
+            {
+                "username": username,
+                "days": [
+                    {"date": day, "day": day_name, "summary": summary, "cached": day not in summarized}
+                    for day, day_name, summary in rows
+                ],
+                "duplicates": fetched.duplicates,
+                "timings": timings.as_dict(),
+            }
+        )
+
+    if not rows:
+        console.print(f"[yellow]No activity found in the last {days} days.[/yellow]")
+        return
+
     if csv_path:
         output = Path(csv_path)
         with output.open("w", newline="") as f:
@@ -5,15 +5,12 @@ from loguru import logger
 from rich.console import Console
 from rich.table import Table
 
+from gustav.paths import APP_NAME, CONFIG_FILE
 from gustav.settings import (
-    APP_NAME,
     KEYRING_ANTHROPIC_KEY,
     KEYRING_GITHUB_TOKEN,
-    CONFIG_FILE,
-    anthropic_key_exists,
-    get_git_config,
-    github_token_exists,
     config_exist,
+    get_git_configs,
 )
 
 console = Console()
@@ -122,7 +119,8 @@ def status():
     table.add_row("GitHub API", github_status)
     if scopes:
         table.add_row("GitHub Permissions", check_github_permissions(scopes))
-    table.add_row("Git user.email", get_git_config("user.email") or "[dim]Not set[/dim]")
-    table.add_row("Git user.name", get_git_config("user.name") or "[dim]Not set[/dim]")
+    git_config = get_git_configs("user.email", "user.name")
+    table.add_row("Git user.email", git_config.get("user.email") or "[dim]Not set[/dim]")
+    table.add_row("Git user.name", git_config.get("user.name") or "[dim]Not set[/dim]")
 
     console.print(table)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from gustav.output import emit_json
+from gustav.usage import GROUP_COLUMNS, summarize_usage
+
+console = Console()
+
+
+@click.command()
+@click.option("--days", "-d", default=7, help="Number of days to include")
+@click.option("--by", "group_by", type=click.Choice(list(GROUP_COLUMNS)), default="day", show_default=True)
+@click.option("--json", "as_json", is_flag=True, help="Print the summary as JSON")
+def usage(days: int, group_by: str, as_json: bool):
+    """Show Claude token usage and latency"""
+    since_day = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    rows = summarize_usage(group_by, since_day)
+
+    if as_json:
+        emit_json(rows)
+        return
+
+    if not rows:
+        console.print(f"[dim]No Claude requests recorded in the last {days} days.[/dim]")
+        return
+
+    table = Table(title=f"Claude usage (last {days} days)", show_header=True, header_style="bold cyan")
+    table.add_column(group_by.capitalize(), style="bold")
+    for column in ["Requests", "Input", "Output", "Cache write", "Cache read", "Avg latency", "Total latency"]:
+        table.add_column(column, justify="right")
+    for row in rows:
+        table.add_row(
+            str(row["group"]),
+            str(row["requests"]),
+            f"{row['input_tokens']:,}",
+            f"{row['output_tokens']:,}",
+            f"{row['cache_creation_input_tokens']:,}",
+            f"{row['cache_read_input_tokens']:,}",
+            f"{row['avg_latency_ms'] / 1000:.2f}s",
+            f"{row['total_latency_ms'] / 1000:.1f}s",
+        )
+    console.print(table)
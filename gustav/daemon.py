@@ -0,0 +1,274 @@
+import _thread
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from importlib import import_module
+from typing import Any, BinaryIO
+
+import click
+from loguru import logger
+
+from gustav import ipc
+from gustav.paths import RUN_DIR
+
+DAEMON_SOCKET = RUN_DIR / "daemon.sock"
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+# how long a client waits for the daemon to take its command before running it locally
+ACCEPT_TIMEOUT = 2.0
+MAX_MESSAGE_SIZE = 1024 * 1024
+STD_FDS = (0, 1, 2)
+WARM_MODULES = ["gustav.commands.commit", "gustav.commands.pull_request", "gustav.commands.report"]
+
+
+def forward(argv: list[str]) -> int | None:
+    sock = ipc.connect(DAEMON_SOCKET, timeout=ACCEPT_TIMEOUT)
+    if sock is None:
+        return None
+
+    message = {"op": "run", "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    with sock, sock.makefile("rb") as reader:
+        try:
+            socket.send_fds(sock, [json.dumps(message).encode() + b"\n"], list(STD_FDS))
+            accepted = ipc.read_message(reader)
+        except OSError as e:
+            logger.debug(f"Daemon unavailable, running locally: {e}")
+            return None
+        if not accepted or not accepted.get("ok"):
+            logger.debug(f"Daemon did not take the command, running locally: {accepted}")
+            return None
+        # the command may wait at a prompt for as long as the user likes
+        sock.settimeout(None)
+        while True:
+            try:
+                response = ipc.read_message(reader)
+            except KeyboardInterrupt:
+                ipc.send_message(sock, {"op": "interrupt"})
+                continue
+            if response is None:
+                click.echo("gus daemon exited unexpectedly.", err=True)
+                return 1
+            return int(response.get("exit_code", 1))
+
+
+def daemon_running() -> bool:
+    return ipc.is_running(DAEMON_SOCKET)
+
+
+def stop_daemon() -> bool:
+    return ipc.request(DAEMON_SOCKET, {"op": "stop"}) is not None
+
+
+def reload_daemon() -> None:
+    ipc.request(DAEMON_SOCKET, {"op": "reload"})
+
+
+def start_daemon(idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> bool:
+    if daemon_running():
+        return False
+    subprocess.Popen(
+        [sys.executable, "-m", "gustav.cli", "daemon", "run", "--timeout", str(int(idle_timeout))],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if daemon_running():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def warm_up() -> None:
+    from gustav.clients.http import get_http_client
+    from gustav.settings import load_settings
+
+    for module in WARM_MODULES:
+        import_module(module)
+    get_http_client()
+    try:
+        load_settings()
+    except Exception as e:
+        logger.debug(f"Daemon started without settings: {e}")
+
+
+def refresh_consoles() -> None:
+    from rich.console import Console
+
+    # module-level consoles detect color support and width once, at creation; rebuild them for each client terminal
+    for name, module in list(sys.modules.items()):
+        if name.startswith("gustav.") and isinstance(getattr(module, "console", None), Console):
+            module.console = Console()  # type: ignore[attr-defined]
+
+
+def watch_client(reader: BinaryIO, running: threading.Event) -> None:
+    while True:
+        try:
+            message = ipc.read_message(reader)
+        except (OSError, ValueError):
+            message = None
+        if not running.is_set():
+            return
+        if message is None or message.get("op") == "interrupt":
+            logger.debug("Daemon client interrupted")
+            _thread.interrupt_main()
+            if message is None:
+                return
+
+
+def run_command(main: click.Command, reader: BinaryIO, message: dict, fds: list[int]) -> int:
+    saved_fds = [os.dup(fd) for fd in STD_FDS]
+    saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    running = threading.Event()
+    running.set()
+
+    try:
+        for fd, target in zip(fds, STD_FDS, strict=True):
+            os.dup2(fd, target)
+        sys.stdin = open(0, closefd=False)  # noqa: SIM115
+        sys.stdout = open(1, "w", closefd=False)  # noqa: SIM115
+        sys.stderr = open(2, "w", closefd=False)  # noqa: SIM115
+        os.environ.clear()
+        os.environ.update(message.get("env") or {})
+        os.chdir(message.get("cwd") or saved_cwd)
+        refresh_consoles()
+        threading.Thread(target=watch_client, args=(reader, running), daemon=True).start()
+
+        start = time.perf_counter()
+        try:
+            main.main(args=message.get("argv") or [], prog_name="gus")
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except Exception as e:
+            logger.exception("Daemon command failed")
+            click.echo(f"Error: {e}", err=True)
+            exit_code = 1
+        logger.debug(
+            f"Daemon served {message.get('argv')}: exit={exit_code} elapsed={time.perf_counter() - start:.2f}s"
+        )
+        return exit_code
+    finally:
+        running.clear()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        for saved, target in zip(saved_fds, STD_FDS, strict=True):
+            os.dup2(saved, target)
+            os.close(saved)
+        for fd in fds:
+            os.close(fd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+
+
+Command = tuple[socket.socket, BinaryIO, dict, list[int]]
+
+
+def read_request(conn: socket.socket) -> tuple[BinaryIO, dict, list[int]]:
+    conn.settimeout(ACCEPT_TIMEOUT)
+    data, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE_SIZE, len(STD_FDS))
+    reader = conn.makefile("rb")
+    if data and not data.endswith(b"\n"):
+        data += reader.readline()
+    try:
+        message = json.loads(data) if data else {}
+    except json.JSONDecodeError:
+        message = {}
+    return reader, message, fds
+
+
+def accept_connections(server: socket.socket, commands: queue.Queue[Command | None], busy: threading.Lock) -> None:
+    from gustav.settings import forget_loaded_settings
+
+    # runs beside the main thread, which executes one command at a time, so ping, reload and stop are answered even
+    # while a command waits at a prompt, and a second client is told to run locally instead of queueing behind it
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except TimeoutError:
+                if busy.locked():
+                    continue
+                logger.debug("Daemon idle, shutting down")
+                return
+            try:
+                reader, message, fds = read_request(conn)
+            except OSError as e:
+                logger.debug(f"Daemon client went away: {e}")
+                conn.close()
+                continue
+
+            op = message.get("op")
+            if op == "run" and len(fds) == len(STD_FDS) and busy.acquire(blocking=False):
+                try:
+                    ipc.send_message(conn, {"ok": True})
+                except OSError as e:
+                    logger.debug(f"Daemon client went away: {e}")
+                    busy.release()
+                else:
+                    conn.settimeout(None)
+                    commands.put((conn, reader, message, fds))
+                    continue
+                response: dict[str, Any] = {"ok": False, "error": "Client went away"}
+            elif op == "run":
+                response = {"ok": False, "error": "Daemon is busy"}
+            elif op == "ping":
+                response = {"ok": True, "pid": os.getpid()}
+            elif op == "reload":
+                forget_loaded_settings()
+                response = {"ok": True}
+            elif op == "stop":
+                response = {"ok": True}
+            else:
+                response = {"ok": False, "error": f"Unknown op: {op}"}
+
+            for fd in fds:
+                os.close(fd)
+            with conn, reader:
+                try:
+                    ipc.send_message(conn, response)
+                except OSError as e:
+                    logger.debug(f"Daemon client went away: {e}")
+            if op == "stop":
+                return
+    finally:
+        commands.put(None)
+
+
+def run_daemon(idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+    from gustav.cli import main
+
+    warm_up()
+    server = ipc.bind(DAEMON_SOCKET)
+    server.settimeout(idle_timeout)
+    commands: queue.Queue[Command | None] = queue.Queue()
+    busy = threading.Lock()
+    threading.Thread(target=accept_connections, args=(server, commands, busy), daemon=True).start()
+    logger.debug(f"Daemon listening on {DAEMON_SOCKET} (idle timeout {idle_timeout:.0f}s)")
+    try:
+        # commands swap the process-wide std fds, environment and cwd, and are interrupted through the main thread
+        while (command := commands.get()) is not None:
+            conn, reader, message, fds = command
+            with conn, reader:
+                try:
+                    response = {"exit_code": run_command(main, reader, message, fds)}
+                    ipc.send_message(conn, response)
+                except OSError as e:
+                    logger.debug(f"Daemon client went away: {e}")
+                except KeyboardInterrupt:
+                    logger.debug("Interrupt arrived after the command finished")
+                finally:
+                    busy.release()
+    finally:
+        server.close()
+        DAEMON_SOCKET.unlink(missing_ok=True)
@@ -0,0 +1,224 @@
+import re
+from collections import Counter
+from fnmatch import fnmatch
+from typing import NamedTuple
+
+from loguru import logger
+
+from gustav.settings import DiffSettings
+from gustav.tracing import span
+
+# rough average for code and English; only used to report savings, never to cut prompts
+CHARS_PER_TOKEN = 4
+# a substitution seen on at least this many lines is treated as a mechanical edit (rename, reformat, codemod)
+MECHANICAL_MIN_LINES = 8
+# longest substitution shown in a mechanical edit summary
+MECHANICAL_MAX_CHARS = 80
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class CompactDiff(NamedTuple):
+    text: str
+    # the diff as git produced it with diff_options, so context and whitespace trimming are already applied
+    tokens_collected: int
+    tokens_compacted: int
+    # new-side line ranges of every hunk by path, taken before compaction
+    changed: dict[str, list[tuple[int, int]]]
+
+
+class FileDiff(NamedTuple):
+    path: str
+    header: list[str]
+    hunks: list[list[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def diff_options(settings: DiffSettings) -> list[str]:
+    options = [f"-U{settings.context_lines}", "-M"]
+    if settings.ignore_space_change:
+        options.append("--ignore-space-change")
+    return options
+
+
+def get_path(header: list[str]) -> str:
+    for prefix in ("rename to ", "+++ b/", "--- a/"):
+        for line in header:
+            if line.startswith(prefix):
+                return line.removeprefix(prefix)
+    # "diff --git a/path b/path"
+    return header[0].rpartition(" b/")[2]
+
+
+def split_diff(diff: str) -> list[FileDiff]:
+    files: list[FileDiff] = []
+    for line in diff.removesuffix("\n").split("\n"):
+        if line.startswith("diff --git "):
+            files.append(FileDiff("", [line], []))
+        elif not files:
+            continue
+        elif line.startswith("@@"):
+            files[-1].hunks.append([line])
+        elif files[-1].hunks:
+            files[-1].hunks[-1].append(line)
+        else:
+            files[-1].header.append(line)
+    return [file._replace(path=get_path(file.header)) for file in files]
+
+
+def count_changes(file: FileDiff) -> tuple[int, int]:
+    lines = [line for hunk in file.hunks for line in hunk[1:]]
+    return sum(line.startswith("+") for line in lines), sum(line.startswith("-") for line in lines)
+
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def cuts_word(text: str, index: int) -> bool:
+    return 0 < index < len(text) and is_word_char(text[index - 1]) and is_word_char(text[index])
+
+
+def common_length(a: str, b: str, limit: int, suffix: bool = False) -> int:
+    # binary search with slice comparisons, which run in C, instead of a loop per character
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a.endswith(b[len(b) - mid :]) if suffix else a.startswith(b[:mid]):
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def substitution(old: str, new: str) -> tuple[str, str]:
+    shortest = min(len(old), len(new))
+    prefix = common_length(old, new, shortest)
+    suffix = common_length(old, new, shortest - prefix, suffix=True)
+    # widen to whole identifiers, so old_name -> new_name is not shown as old -> new
+    while prefix and is_word_char(old[prefix - 1]) and (cuts_word(old, prefix) or cuts_word(new, prefix)):
+        prefix -= 1
+    while (
+        suffix
+        and is_word_char(old[-suffix])
+        and (cuts_word(old, len(old) - suffix) or cuts_word(new, len(new) - suffix))
+    ):
+        suffix -= 1
+    return old[prefix : len(old) - suffix], new[prefix : len(new) - suffix]
+
+
+def hunk_substitutions(hunk: list[str]) -> list[tuple[str, str]] | None:
+    # pairs each run of removed lines with the added lines that follow; None when the runs do not line up
+    pairs: list[tuple[str, str]] = []
+    removed: list[str] = []
+    added: list[str] = []
+    # the trailing context line closes the last run
+    for line in [*hunk[1:], " "]:
+        marker = line[:1]
+        if marker == "+":
+            added.append(line)
+        elif marker == "-" and not added:
+            removed.append(line)
+        elif marker != "\\":
+            if removed or added:
+                if len(removed) != len(added):
+                    return None
+                pairs.extend(zip(removed, added, strict=True))
+                removed, added = [], []
+            if marker == "-":
+                removed.append(line)
+    return [substitution(old[1:], new[1:]) for old, new in pairs] or None
+
+
+def describe_substitutions(pairs: list[tuple[str, str]], hunks: int) -> str:
+    counts = Counter(pairs)
+    edits = ", ".join(
+        f"{old[:MECHANICAL_MAX_CHARS]!r} -> {new[:MECHANICAL_MAX_CHARS]!r}" for (old, new), _ in counts.most_common()
+    )
+    where = f" in {hunks} hunks" if hunks > 1 else ""
+    return f"[mechanical edit on {len(pairs)} lines{where}: {edits}]"
+
+
+def summarize_mechanical(files: list[FileDiff]) -> list[FileDiff]:
+    hunk_pairs = {(i, j): hunk_substitutions(hunk) for i, file in enumerate(files) for j, hunk in enumerate(file.hunks)}
+    seen = Counter(pair for pairs in hunk_pairs.values() if pairs for pair in pairs)
+    mechanical = {pair for pair, count in seen.items() if count >= MECHANICAL_MIN_LINES}
+
+    def is_mechanical(pairs: list[tuple[str, str]] | None) -> bool:
+        return pairs is not None and all(pair in mechanical for pair in pairs)
+
+    summarized = []
+    for i, file in enumerate(files):
+        pairs = [hunk_pairs[i, j] for j in range(len(file.hunks))]
+        if file.hunks and all(is_mechanical(p) for p in pairs):
+            all_pairs = [pair for p in pairs if p for pair in p]
+            summarized.append(file._replace(hunks=[[describe_substitutions(all_pairs, len(file.hunks))]]))
+            continue
+        hunks = [
+            [hunk[0], describe_substitutions(p, 1)] if p and is_mechanical(p) else hunk
+            for hunk, p in zip(file.hunks, pairs, strict=True)
+        ]
+        summarized.append(file._replace(hunks=hunks))
+    return summarized
+
+
+def is_pure_rename(file: FileDiff) -> bool:
+    return not file.hunks and any(line == "similarity index 100%" for line in file.header)
+
+
+def get_rename_source(file: FileDiff) -> str:
+    return next((line.removeprefix("rename from ") for line in file.header if line.startswith("rename from ")), "")
+
+
+def is_ignored(path: str, patterns: list[str]) -> str | None:
+    for pattern in patterns:
+        if fnmatch(path, pattern) or fnmatch(path.rpartition("/")[2], pattern):
+            return pattern
+    return None
+
+
+def get_changed_ranges(file: FileDiff) -> list[tuple[int, int]]:
+    ranges = []
+    for hunk in file.hunks:
+        if match := HUNK_HEADER.match(hunk[0]):
+            start = int(match[1])
+            ranges.append((start, start + max(int(match[2] or 1), 1) - 1))
+    return ranges
+
+
+def collapse_file(file: FileDiff, settings: DiffSettings, omitted: dict[str, str]) -> FileDiff:
+    # a collapsed file keeps a short header and no hunks, so later passes leave it alone
+    if settings.collapse_renames and is_pure_rename(file):
+        return file._replace(header=[f"renamed {get_rename_source(file)} -> {file.path} (unchanged)"], hunks=[])
+    if pattern := is_ignored(file.path, settings.ignore):
+        reason = f"matches {pattern!r}"
+    elif not (reason := omitted.get(file.path, "")) or not file.hunks:
+        return file
+    added, removed = count_changes(file)
+    return file._replace(header=[file.header[0], f"[diff omitted, {reason}: +{added} -{removed}]"], hunks=[])
+
+
+def compact_diff(diff: str, settings: DiffSettings, omitted: dict[str, str] | None = None) -> CompactDiff:
+    # omitted maps paths whose hunks are dropped to the reason, e.g. from the changed file classification
+    with span("compact_diff") as attributes:
+        files = split_diff(diff)
+        changed = {file.path: get_changed_ranges(file) for file in files}
+        files = [collapse_file(file, settings, omitted or {}) for file in files]
+        if settings.summarize_mechanical:
+            files = summarize_mechanical(files)
+
+        lines: list[str] = []
+        for file in files:
+            lines.extend(file.header)
+            for hunk in file.hunks:
+                lines.extend(hunk)
+
+        text = "\n".join(lines) + "\n" if lines else ""
+        result = CompactDiff(text, estimate_tokens(diff), estimate_tokens(text), changed)
+        attributes["tokens_collected"] = result.tokens_collected
+        attributes["tokens_compacted"] = result.tokens_compacted
+    logger.debug(f"Diff compacted: ~{result.tokens_collected} -> ~{result.tokens_compacted} tokens")
+    return result
@@ -0,0 +1,143 @@
+import json
+import os
+import socket
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO
+
+import click
+from loguru import logger
+
+Handler = Callable[[dict], dict]
+
+
+def send_message(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def read_message(reader: BinaryIO) -> dict | None:
+    line = reader.readline()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def connect(path: Path, timeout: float | None = 2.0) -> socket.socket | None:
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(path: Path, message: dict, timeout: float = 2.0) -> dict | None:
+    sock = connect(path, timeout)
+    if sock is None:
+        return None
+    try:
+        with sock, sock.makefile("rb") as reader:
+            send_message(sock, message)
+            return read_message(reader)
+    except OSError as e:
+        logger.debug(f"IPC request to {path} failed: {e}")
+        return None
+
+
+def is_running(path: Path) -> bool:
+    response = request(path, {"op": "ping"})
+    return bool(response and response.get("ok"))
+
+
+def is_stale(path: Path) -> bool:
+    # only a refused or missing socket is stale; a server too busy to answer in time still owns it
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(2.0)
+    try:
+        sock.connect(str(path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        return True
+    except OSError as e:
+        logger.debug(f"Could not reach {path}, assuming it is in use: {e}")
+        return False
+    finally:
+        sock.close()
+    return False
+
+
+def bind(path: Path) -> socket.socket:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.parent.chmod(0o700)
+    if path.exists():
+        if not is_stale(path):
+            raise click.ClickException(f"Already running on {path}")
+        path.unlink(missing_ok=True)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    return server
+
+
+def handle_connection(conn: socket.socket, reader: BinaryIO, message: dict, handler: Handler) -> None:
+    with conn, reader:
+        try:
+            response = handler(message)
+        except Exception as e:
+            logger.exception(f"IPC handler failed for op={message.get('op')}")
+            response = {"ok": False, "error": str(e)}
+        try:
+            send_message(conn, response)
+        except OSError as e:
+            logger.debug(f"IPC client went away: {e}")
+
+
+def serve(path: Path, handler: Handler, idle_timeout: float) -> None:
+    server = bind(path)
+    server.settimeout(idle_timeout)
+    logger.debug(f"Listening on {path} (idle timeout {idle_timeout:.0f}s)")
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except TimeoutError:
+                logger.debug(f"Idle for {idle_timeout:.0f}s, shutting down {path}")
+                return
+            # ping and stop are answered here; everything else runs on its own thread so a slow handler (a keychain
+            # prompt) never keeps other clients waiting
+            conn.settimeout(2.0)
+            reader = conn.makefile("rb")
+            try:
+                message = read_message(reader)
+            except OSError as e:
+                logger.debug(f"IPC client went away: {e}")
+                message = None
+            op = message.get("op") if message else None
+            if message is not None and op not in ("ping", "stop"):
+                threading.Thread(target=handle_connection, args=(conn, reader, message, handler), daemon=True).start()
+                continue
+            with conn, reader:
+                try:
+                    if op == "ping":
+                        send_message(conn, {"ok": True, "pid": os.getpid()})
+                    elif op == "stop":
+                        send_message(conn, {"ok": True})
+                except OSError as e:
+                    logger.debug(f"IPC client went away: {e}")
+            if op == "stop":
+                return
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
@@ -1,6 +1,6 @@
 from loguru import logger
 
-from gustav.settings import LOG_DIR
+from gustav.paths import LOG_DIR
 
 
 def setup_logging() -> None:
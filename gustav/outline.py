@@ -0,0 +1,135 @@
+import ast
+import re
+from collections import OrderedDict
+from typing import NamedTuple
+
+from gustav.tracing import span
+
+# files shorter than this are sent whole; an outline would barely be shorter
+OUTLINE_MIN_CHARS = 4000
+# a changed symbol longer than this shows only the changed lines, not its whole body
+MAX_EXPANDED_LINES = 150
+# blobs whose symbols are kept in memory, so the daemon and gus pr --all skip re-parsing
+MEMO_SIZE = 512
+
+# declarations in common languages, for files ast cannot parse
+DECLARATION = re.compile(
+    r"^(?P<indent>\s*)(?:(?:export|default|public|private|protected|internal|static|abstract|final|async|pub(?:\(\w+\))?"
+    r"|unsafe|override|virtual|inline|const)\s+)*"
+    r"(?:class|interface|struct|enum|trait|impl|fn|func|function|def|module|namespace|type|record|object)\b"
+)
+# methods, arrow functions and other blocks opened by a signature: "name(args) ... {" that is not control flow
+BLOCK_SIGNATURE = re.compile(
+    r"^(?P<indent>\s*)(?!(?:if|else|for|while|do|switch|case|catch|try|return)\b)\S[^;]*\)[^;]*\{\s*$"
+)
+# longer lines are never treated as signatures, which also bounds the regex work
+MAX_SIGNATURE_CHARS = 300
+
+
+class Symbol(NamedTuple):
+    start: int
+    # last line of the signature (decorators and the def/class line)
+    header_end: int
+    end: int
+
+
+_memo: OrderedDict[str, list[Symbol]] = OrderedDict()
+
+
+def python_symbols(source: str) -> list[Symbol] | None:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    symbols = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef):
+            start = min([node.lineno, *(decorator.lineno for decorator in node.decorator_list)])
+            header_end = max(node.body[0].lineno - 1, node.lineno)
+            symbols.append(Symbol(start, header_end, node.end_lineno or header_end))
+        if isinstance(node, ast.Module | ast.ClassDef):
+            # one-line constants and fields are part of the outline too
+            symbols.extend(
+                Symbol(child.lineno, child.lineno, child.lineno)
+                for child in node.body
+                if isinstance(child, ast.Assign | ast.AnnAssign) and child.end_lineno == child.lineno
+            )
+    return sorted(symbols)
+
+
+def regex_symbols(lines: list[str]) -> list[Symbol]:
+    # a declaration runs until the next non-blank line indented at or above its own level
+    declarations = [
+        (number, len(match["indent"].expandtabs()))
+        for number, line in enumerate(lines, 1)
+        if len(line) <= MAX_SIGNATURE_CHARS and (match := DECLARATION.match(line) or BLOCK_SIGNATURE.match(line))
+    ]
+    symbols = []
+    for number, indent in declarations:
+        end = len(lines)
+        for following in range(number + 1, len(lines) + 1):
+            line = lines[following - 1]
+            if line.strip() and len(line.expandtabs()) - len(line.expandtabs().lstrip()) <= indent:
+                # a closing brace at the same indent still belongs to the declaration
+                end = following if line.strip()[0] in "}])" else following - 1
+                break
+        symbols.append(Symbol(number, number, end))
+    return symbols
+
+
+def get_symbols(blob: str, path: str, source: str, lines: list[str]) -> list[Symbol]:
+    if blob in _memo:
+        _memo.move_to_end(blob)
+        return _memo[blob]
+    symbols = python_symbols(source) if path.endswith((".py", ".pyi")) else None
+    if symbols is None:
+        symbols = regex_symbols(lines)
+    _memo[blob] = symbols
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+    return symbols
+
+
+def render(lines: list[str], keep: set[int]) -> str:
+    outline: list[str] = []
+    previous = 0
+    for number in sorted(n for n in keep if 1 <= n <= len(lines)):
+        if number > previous + 1:
+            line = lines[number - 1]
+            outline.append(f"{line[: len(line) - len(line.lstrip())]}...")
+        outline.append(lines[number - 1])
+        previous = number
+    if previous < len(lines):
+        outline.append("...")
+    return "\n".join(outline)
+
+
+def build_outline(blob: str, path: str, source: str, changed: list[tuple[int, int]]) -> str | None:
+    # signatures of every symbol, whole bodies of the symbols around changes and the changed lines themselves;
+    # None when that is not shorter than the file
+    if len(source) < OUTLINE_MIN_CHARS:
+        return None
+    with span("outline", path=path) as attributes:
+        lines = source.splitlines()
+        symbols = get_symbols(blob, path, source, lines)
+
+        keep: set[int] = set()
+        for symbol in symbols:
+            keep.update(range(symbol.start, symbol.header_end + 1))
+        for first, last in changed:
+            keep.update(range(first, last + 1))
+            enclosing = [s for s in symbols if s.start <= last and s.end >= first]
+            if enclosing:
+                innermost = max(enclosing, key=lambda s: s.start)
+                if innermost.end - innermost.start < MAX_EXPANDED_LINES:
+                    keep.update(range(innermost.start, innermost.end + 1))
+
+        text = render(lines, keep)
+        attributes["chars_before"] = len(source)
+        attributes["chars_after"] = len(text)
+    return text if len(text) < len(source) else None
+
+
+def build_summary(blob: str, path: str, source: str) -> str | None:
+    # the outline without any bodies: what a later run sends instead of a file version it has sent before
+    return build_outline(blob, path, source, [])
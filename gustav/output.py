@@ -0,0 +1,27 @@
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import click
+
+
+class Timings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self.phases.get(name, 0) + time.perf_counter() - start, 3)
+
+    def as_dict(self) -> dict[str, float]:
+        return {**self.phases, "total": round(time.perf_counter() - self.start, 3)}
+
+
+def emit_json(result: dict | list) -> None:
+    click.echo(json.dumps(result, indent=2))
@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+APP_NAME = "gus"
+CONFIG_DIR = Path.home() / ".config" / APP_NAME
+CONFIG_FILE = CONFIG_DIR / "config.yaml"
+CACHE_DIR = CONFIG_DIR / "cache"
+DATA_DIR = CONFIG_DIR / "data"
+LOG_DIR = CONFIG_DIR / "logs"
+SETTINGS_SNAPSHOT_FILE = DATA_DIR / "settings.json"
+RUN_DIR = Path(os.environ["XDG_RUNTIME_DIR"]) / APP_NAME if os.environ.get("XDG_RUNTIME_DIR") else CONFIG_DIR / "run"
@@ -0,0 +1,285 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+import click
+import httpx
+from loguru import logger
+from rich.console import Console
+from rich.prompt import Prompt
+from rich.table import Table
+
+from gustav.clients.claude import ClaudeClient
+from gustav.clients.git import GitClient
+from gustav.clients.github import GitHubClient
+from gustav.commands.pull_request import (
+    PrContent,
+    collect_branch_changes,
+    generate_pr_content,
+    interactive_pr_loop,
+    is_missing_on_remote,
+)
+from gustav.output import Timings, emit_json
+from gustav.prompts.loader import Segments
+from gustav.settings import DiffSettings, FilesSettings, Settings
+from gustav.usage import set_repo
+
+console = Console()
+
+
+@dataclass(slots=True)
+class RepoState:
+    path: str
+    repo: str = ""
+    branch: str = ""
+    base_branch: str = ""
+    commits: str = ""
+    diff_stat: str = ""
+    diff: str = ""
+    files_content: Segments = field(default_factory=list)
+    pr: dict | None = None
+    content: PrContent | None = None
+    skipped: str = ""
+    error: str = ""
+    url: str = ""
+    applied: bool = False
+
+    @property
+    def pending(self) -> bool:
+        return not self.skipped and not self.error
+
+    @property
+    def action(self) -> str:
+        if self.error:
+            return "error"
+        if self.skipped:
+            return "skip"
+        if not self.pr:
+            return "create"
+        if self.content and (self.content.title, self.content.description) == (
+            self.pr.get("title", ""),
+            self.pr.get("body", "") or "",
+        ):
+            return "unchanged"
+        return "update"
+
+
+def find_repos(patterns: tuple[str, ...]) -> list[str]:
+    roots: list[str] = []
+    for pattern in patterns or ("*",):
+        pattern = os.path.expanduser(pattern)
+        if glob.has_magic(pattern):
+            paths = [path for path in sorted(glob.glob(pattern)) if os.path.exists(os.path.join(path, ".git"))]
+        elif os.path.isdir(pattern):
+            paths = [pattern]
+        else:
+            raise click.ClickException(f"{pattern} is not a directory.")
+        for path in paths:
+            root = os.path.abspath(path)
+            if root not in roots:
+                roots.append(root)
+    return roots
+
+
+# the two git phases run in worker processes, so they take and return plain picklable state
+def read_repo(path: str) -> RepoState:
+    state = RepoState(path)
+    try:
+        git = GitClient(path)
+        state.branch = git.get_current_branch()
+        state.repo = git.get_remote_repo() or ""
+    except click.ClickException as e:
+        state.error = e.message
+        return state
+    if not state.repo:
+        state.error = "Could not determine repository from git remote"
+    elif not state.branch:
+        state.skipped = "detached HEAD"
+    return state
+
+
+def collect_branch(
+    state: RepoState, diff_settings: DiffSettings, files_settings: FilesSettings, push: bool = True
+) -> RepoState:
+    git = GitClient(state.path)
+    try:
+        if push:
+            remote = git.get_remote_branch(state.branch)
+            if remote.needs_push or is_missing_on_remote(git, state.branch, remote, state.pr):
+                git.push(state.branch)
+        state.commits = git.get_branch_commits(state.base_branch)
+        if not state.commits.strip():
+            state.skipped = "no commits"
+            return state
+        state.diff_stat = git.get_branch_diff_stat(state.base_branch)
+        compacted, state.files_content = collect_branch_changes(git, state.base_branch, diff_settings, files_settings)
+        state.diff = compacted.text
+    except click.ClickException as e:
+        state.error = e.message
+    return state
+
+
+def look_up_pr(github: GitHubClient, state: RepoState) -> None:
+    try:
+        state.base_branch = github.get_default_branch(state.repo)
+        if state.branch == state.base_branch:
+            state.skipped = f"on '{state.base_branch}'"
+            return
+        state.pr = github.get_pr(state.repo, state.branch)
+    except click.ClickException as e:
+        state.error = e.message
+    except httpx.HTTPError as e:
+        state.error = f"GitHub request failed: {e}"
+
+
+def generate(claude: ClaudeClient, state: RepoState) -> None:
+    set_repo(state.repo)
+    existing_title = state.pr.get("title", "") if state.pr else None
+    existing_body = (state.pr.get("body", "") or "") if state.pr else None
+    try:
+        state.content = generate_pr_content(
+            claude, state.commits, state.diff_stat, state.diff, state.files_content, existing_title, existing_body
+        )
+    except click.ClickException as e:
+        state.error = e.message
+
+
+def apply(github: GitHubClient, state: RepoState) -> None:
+    assert state.content is not None
+    try:
+        if state.pr:
+            github.update_pr(state.repo, state.pr["number"], state.content.title, state.content.description)
+            state.url = state.pr.get("url", "")
+        else:
+            state.url = github.create_pr(
+                state.repo, state.branch, state.content.title, state.content.description, base=state.base_branch
+            )
+        state.applied = True
+    except click.ClickException as e:
+        state.error = e.message
+
+
+def review(claude: ClaudeClient, state: RepoState) -> bool:
+    assert state.content is not None
+    if state.pr:
+        panel_title = f"{state.repo}: Update Pull Request #{state.pr['number']} - {state.pr.get('url', '')}"
+        result = interactive_pr_loop(
+            claude,
+            state.content.title,
+            state.content.description,
+            panel_title,
+            state.pr.get("title", ""),
+            state.pr.get("body", "") or "",
+        )
+    else:
+        result = interactive_pr_loop(
+            claude, state.content.title, state.content.description, f"{state.repo}: New Pull Request"
+        )
+    if result:
+        state.content = PrContent(*result)
+    return result is not None
+
+
+def to_json(state: RepoState) -> dict:
+    return {
+        "path": state.path,
+        "repo": state.repo,
+        "branch": state.branch,
+        "action": state.action,
+        "number": state.pr["number"] if state.pr else None,
+        "url": state.url or (state.pr.get("url", "") if state.pr else None),
+        "title": state.content.title if state.content else None,
+        "description": state.content.description if state.content else None,
+        "cached": state.content.cached if state.content else False,
+        "applied": state.applied,
+        "skipped": state.skipped or None,
+        "error": state.error or None,
+    }
+
+
+def build_table(states: list[RepoState], title: str) -> Table:
+    table = Table(title=title, show_header=True, header_style="bold cyan")
+    table.add_column("Repo", style="bold")
+    table.add_column("Branch")
+    table.add_column("Action")
+    table.add_column("Title")
+    styles = {"error": "red", "skip": "dim", "unchanged": "dim", "create": "green", "update": "yellow"}
+    for state in states:
+        action = state.action
+        detail = state.error or state.skipped or (state.content.title if state.content else "")
+        if state.url:
+            detail = f"{detail}\n[dim]{state.url}[/dim]"
+        table.add_row(
+            state.repo or os.path.basename(state.path), state.branch, f"[{styles[action]}]{action}[/]", detail
+        )
+    return table
+
+
+def run_batch(
+    claude: ClaudeClient,
+    github: GitHubClient,
+    settings: Settings,
+    patterns: tuple[str, ...],
+    jobs: int,
+    yes: bool,
+    as_json: bool = False,
+) -> None:
+    console.quiet = as_json
+    timings = Timings()
+    paths = find_repos(patterns)
+    if not paths:
+        raise click.ClickException("No git repositories found.")
+
+    with (
+        ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as processes,
+        ThreadPoolExecutor(max_workers=jobs) as threads,
+    ):
+        with timings.phase("lookup"), console.status(f"[bold blue]Reading {len(paths)} repos..."):
+            states = list(processes.map(read_repo, paths))
+            pending = [state for state in states if state.pending]
+            list(threads.map(lambda state: look_up_pr(github, state), pending))
+
+        pending = [state for state in states if state.pending]
+        with timings.phase("collect"), console.status(f"[bold blue]Collecting branches in {len(pending)} repos..."):
+            # a JSON run without --yes is a dry run, so it does not push either
+            collected = processes.map(
+                partial(
+                    collect_branch,
+                    diff_settings=settings.diff,
+                    files_settings=settings.files,
+                    push=yes or not as_json,
+                ),
+                pending,
+            )
+            states = [next(collected) if state.pending else state for state in states]
+
+        pending = [state for state in states if state.pending]
+        with timings.phase("generate"), console.status(f"[bold blue]Generating {len(pending)} PRs..."):
+            # the thread pool size is the global cap on concurrent Claude requests
+            list(threads.map(lambda state: generate(claude, state), pending))
+
+        to_apply = [state for state in states if state.action in ("create", "update")]
+        console.print(build_table(states, "Pull Requests"))
+        if not to_apply:
+            console.print("[dim]Nothing to apply.[/dim]")
+        elif as_json and not yes:
+            to_apply = []
+        elif not yes:
+            console.print("[dim](y) apply all  (n) cancel  (r) review each[/dim]")
+            choice = Prompt.ask(f"Apply {len(to_apply)} PRs?", choices=["y", "n", "r"], default="y")
+            if choice == "n":
+                console.print("[dim]Cancelled.[/dim]")
+                to_apply = []
+            elif choice == "r":
+                to_apply = [state for state in to_apply if review(claude, state)]
+
+        if to_apply:
+            with timings.phase("apply"), console.status(f"[bold blue]Applying {len(to_apply)} PRs..."):
+                list(threads.map(lambda state: apply(github, state), to_apply))
+            console.print(build_table(to_apply, "Applied"))
+
+    logger.debug(f"Batch: {len(to_apply)} applied, {sum(1 for s in states if s.error)} failed of {len(states)} repos")
+    if as_json:
+        emit_json({"repos": [to_json(state) for state in states], "timings": timings.as_dict()})
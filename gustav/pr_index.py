@@ -0,0 +1,135 @@
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple
+
+from loguru import logger
+
+from gustav.paths import CACHE_DIR
+
+# what gus pr last saw of each repo and of the open PR of each branch, so repeated runs skip the repo lookup and
+# revalidate the PR with a conditional request instead of searching by head branch
+PR_INDEX_DB = CACHE_DIR / "pr_index.db"
+SCHEMA_VERSION = 2
+TABLES = ["repos", "pulls"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    repo TEXT PRIMARY KEY,
+    default_branch TEXT NOT NULL,
+    etag TEXT,
+    checked REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pulls (
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    head TEXT NOT NULL,
+    etag TEXT,
+    checked REAL NOT NULL,
+    PRIMARY KEY (repo, branch)
+);
+"""
+
+
+class RepoEntry(NamedTuple):
+    default_branch: str
+    etag: str | None
+    # when GitHub last confirmed it, in seconds since the epoch
+    checked: float
+
+
+class PullEntry(NamedTuple):
+    number: int
+    url: str
+    title: str
+    body: str
+    # the head commit GitHub reported
+    head: str
+    # None after gus changed the PR, until the next GET returns a new one
+    etag: str | None
+    # when GitHub last confirmed it, in seconds since the epoch
+    checked: float
+
+    def as_pr(self) -> dict:
+        return {"number": self.number, "title": self.title, "body": self.body, "url": self.url, "head": self.head}
+
+
+def connect(path: Path = PR_INDEX_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != SCHEMA_VERSION:
+        for table in TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_repo(repo: str) -> RepoEntry | None:
+    if not PR_INDEX_DB.exists():
+        return None
+    try:
+        with closing(connect()) as conn:
+            row = conn.execute("SELECT default_branch, etag, checked FROM repos WHERE repo = ?", (repo,)).fetchone()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not read the PR index: {e}")
+        return None
+    return RepoEntry(*row) if row else None
+
+
+def set_repo(repo: str, default_branch: str, etag: str | None) -> None:
+    try:
+        with closing(connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?)", (repo, default_branch, etag, time.time()))
+    except sqlite3.Error as e:
+        logger.debug(f"Could not update the PR index: {e}")
+
+
+def get_pull(repo: str, branch: str) -> PullEntry | None:
+    if not PR_INDEX_DB.exists():
+        return None
+    try:
+        with closing(connect()) as conn:
+            row = conn.execute(
+                "SELECT number, url, title, body, head, etag, checked FROM pulls WHERE repo = ? AND branch = ?",
+                (repo, branch),
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not read the PR index: {e}")
+        return None
+    return PullEntry(*row) if row else None
+
+
+def set_pull(repo: str, branch: str, pull: PullEntry) -> None:
+    try:
+        with closing(connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO pulls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (repo, branch, *pull))
+    except sqlite3.Error as e:
+        logger.debug(f"Could not update the PR index: {e}")
+
+
+def forget_pull(repo: str, branch: str) -> None:
+    if not PR_INDEX_DB.exists():
+        return
+    try:
+        with closing(connect()) as conn, conn:
+            conn.execute("DELETE FROM pulls WHERE repo = ? AND branch = ?", (repo, branch))
+    except sqlite3.Error as e:
+        logger.debug(f"Could not update the PR index: {e}")
+
+
+def count_pulls() -> int:
+    if not PR_INDEX_DB.exists():
+        return 0
+    with closing(connect()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM pulls").fetchone()[0]
+
+
+def clear_index() -> None:
+    PR_INDEX_DB.unlink(missing_ok=True)
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import click
+from loguru import logger
+
+from gustav.cache import get_cached
+from gustav.clients.git import GitClient
+from gustav.paths import RUN_DIR
+
+PREWARM_SKIP_ENV = "GUS_SKIP_PREWARM"
+DEFAULT_DELAY = 1.5
+WAIT_TIMEOUT = 60
+HOOK_NAME = "post-index-change"
+HOOK_MARKER = "# installed by gus prewarm"
+HOOK_SCRIPT = f"""#!/bin/sh
+{HOOK_MARKER}
+command -v gus >/dev/null 2>&1 && gus prewarm >/dev/null 2>&1
+exit 0
+"""
+
+
+def get_pid_file(git: GitClient) -> Path:
+    repo_id = hashlib.sha256(git.get_repo_root().encode()).hexdigest()[:16]
+    return RUN_DIR / f"prewarm-{repo_id}.pid"
+
+
+def read_pid_file(git: GitClient) -> tuple[int, str] | None:
+    # the running worker's pid and the index fingerprint it was started for
+    try:
+        pid, _, fingerprint = get_pid_file(git).read_text().partition("\n")
+        return int(pid), fingerprint.strip()
+    except (OSError, ValueError):
+        return None
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def get_worker_pid(git: GitClient) -> int | None:
+    worker = read_pid_file(git)
+    return worker[0] if worker is not None and is_alive(worker[0]) else None
+
+
+def is_warming(git: GitClient) -> bool:
+    # a worker is alive and was started for the index as it is now
+    worker = read_pid_file(git)
+    return worker is not None and is_alive(worker[0]) and worker[1] == git.get_index_fingerprint()
+
+
+def cancel_worker(git: GitClient) -> None:
+    pid = get_worker_pid(git)
+    if pid is None:
+        return
+    try:
+        os.kill(pid, signal.SIGTERM)
+        logger.debug(f"Cancelled prewarm worker {pid}")
+    except OSError:
+        pass
+
+
+def schedule_prewarm(git: GitClient, delay: float = DEFAULT_DELAY) -> int:
+    # stat-only index refreshes fire the hook too; keep a worker that is already generating for the same content
+    fingerprint = git.get_index_fingerprint()
+    worker = read_pid_file(git)
+    if worker is not None and worker[1] == fingerprint and is_alive(worker[0]):
+        logger.debug(f"Prewarm worker {worker[0]} is already running for this index")
+        return worker[0]
+
+    cancel_worker(git)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gustav.cli", "prewarm", "--worker", "--delay", str(delay)],
+        cwd=git.get_repo_root(),
+        env={**os.environ, PREWARM_SKIP_ENV: "1"},
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    pid_file = get_pid_file(git)
+    pid_file.parent.mkdir(parents=True, exist_ok=True)
+    pid_file.write_text(f"{process.pid}\n{fingerprint}")
+    logger.debug(f"Scheduled prewarm worker {process.pid} in {delay:.1f}s")
+    return process.pid
+
+
+def wait_for_prewarm(git: GitClient, timeout: float = WAIT_TIMEOUT) -> None:
+    deadline = time.monotonic() + timeout
+    while get_worker_pid(git) is not None and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+def run_worker(delay: float) -> None:
+    from gustav.clients.claude import ClaudeClient
+    from gustav.commands.commit import (
+        classify_staged_files,
+        collect_files_content,
+        generate_commit_message,
+        get_commit_cache_key,
+        get_compacted_diff,
+        has_alternatives,
+    )
+    from gustav.settings import load_settings
+    from gustav.usage import set_command, set_repo
+
+    git = GitClient()
+    set_command("prewarm")
+    set_repo(git.get_repo_name())
+    pid_file = get_pid_file(git)
+    try:
+        time.sleep(delay)
+        fingerprint = git.get_index_fingerprint()
+
+        staged_files = git.get_staged_files()
+        if not staged_files:
+            logger.debug("Prewarm: nothing staged")
+            return
+
+        settings = load_settings()
+        diff_stat = git.get_staged_diff_stat()
+        files = classify_staged_files(git)
+        compacted = get_compacted_diff(git, settings, files)
+        diff = compacted.text
+        cached = get_cached(get_commit_cache_key(diff_stat, diff))
+        if cached is not None and has_alternatives(cached, settings.commit.alternatives):
+            logger.debug("Prewarm: commit message already cached")
+            return
+
+        files_content = collect_files_content(git, files, settings.files, compacted)
+        if git.get_index_fingerprint() != fingerprint:
+            logger.debug("Prewarm: index changed while collecting, abandoning")
+            return
+
+        start = time.perf_counter()
+        generate_commit_message(
+            ClaudeClient(settings.anthropic), diff_stat, diff, files_content, settings.commit.alternatives, cached
+        )
+        logger.debug(f"Prewarm: commit message cached in {time.perf_counter() - start:.2f}s")
+    except (click.ClickException, FileNotFoundError, ValueError) as e:
+        logger.debug(f"Prewarm failed: {e}")
+    finally:
+        worker = read_pid_file(git)
+        if worker is not None and worker[0] == os.getpid():
+            pid_file.unlink(missing_ok=True)
+
+
+def install_hook(git: GitClient) -> Path:
+    hook = Path(git.get_hooks_dir()) / HOOK_NAME
+    if hook.exists() and HOOK_MARKER not in hook.read_text():
+        raise click.ClickException(f"{hook} already exists. Add 'gus prewarm' to it manually.")
+    hook.parent.mkdir(parents=True, exist_ok=True)
+    hook.write_text(HOOK_SCRIPT)
+    hook.chmod(0o755)
+    return hook
+
+
+def uninstall_hook(git: GitClient) -> Path | None:
+    hook = Path(git.get_hooks_dir()) / HOOK_NAME
+    if not hook.exists() or HOOK_MARKER not in hook.read_text():
+        return None
+    hook.unlink()
+    return hook
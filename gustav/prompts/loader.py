@@ -1,9 +1,76 @@
+import hashlib
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
+from string import Formatter
+
+from gustav.tracing import span
 
 PROMPTS_DIR = Path(__file__).parent
 
+# a value that is already split into parts (e.g. one per file); the parts are never joined, only encoded
+Segments = list[str]
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedPrompt:
+    name: str
+    template_hash: str
+    segments: tuple[str, ...]
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    def __str__(self) -> str:
+        return "".join(self.segments)
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    name: str
+    # literals[i] comes before fields[i]; the last literal follows the last field
+    literals: tuple[str, ...]
+    fields: tuple[str, ...]
+    hash: str
+
+    def render(self, **kwargs: str | Segments) -> RenderedPrompt:
+        segments = []
+        for literal, field in zip(self.literals, self.fields, strict=False):
+            segments.append(literal)
+            value = kwargs[field]
+            if isinstance(value, str):
+                segments.append(value)
+            else:
+                segments.extend(value)
+        segments.append(self.literals[-1])
+        return RenderedPrompt(self.name, self.hash, tuple(segment for segment in segments if segment))
+
+
+def parse_template(name: str, text: str) -> Template:
+    literals, fields = [], []
+    pending = ""
+    for literal, field, format_spec, conversion in Formatter().parse(text):
+        pending += literal
+        if field is None:
+            continue
+        if format_spec or conversion or not field.isidentifier():
+            raise ValueError(f"Prompt {name}: only plain {{name}} placeholders are supported, got {{{field}}}")
+        literals.append(pending)
+        fields.append(field)
+        pending = ""
+    literals.append(pending)
+    return Template(name, tuple(literals), tuple(fields), hashlib.sha256(text.encode()).hexdigest()[:16])
+
+
+@cache
+def get_template(name: str) -> Template:
+    return parse_template(name, (PROMPTS_DIR / f"{name}.md").read_text())
+
 
-def load_prompt(name: str, **kwargs: str) -> str:
-    prompt_file = PROMPTS_DIR / f"{name}.md"
-    template = prompt_file.read_text()
-    return template.format(**kwargs)
+def load_prompt(name: str, **kwargs: str | Segments) -> RenderedPrompt:
+    with span("load_prompt", prompt=name) as attributes:
+        template = get_template(name)
+        prompt = template.render(**kwargs)
+        attributes["template"] = template.hash
+        attributes["chars"] = len(prompt)
+    return prompt
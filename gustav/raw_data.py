@@ -0,0 +1,33 @@
+import json
+import os
+from pathlib import Path
+
+from gustav.paths import DATA_DIR
+
+
+def get_raw_data_path(username: str) -> Path:
+    return DATA_DIR / f"report_{username}.ndjson"
+
+
+# one {"kind": ..., "data": ...} object per line, written as pages arrive and moved into place on success
+class RawDataWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_suffix(path.suffix + ".tmp")
+        self.count = 0
+
+    def __enter__(self) -> "RawDataWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.tmp_path.open("w")
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+
+    def write(self, kind: str, data: dict, **fields: str) -> None:
+        self.file.write(json.dumps({"kind": kind, **fields, "data": data}, separators=(",", ":")) + "\n")
+        self.count += 1
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import NamedTuple
+
+
+@dataclass(slots=True, frozen=True)
+class CommitRecord:
+    sha: str
+    repo: str
+    day: str
+    message: str
+
+
+@dataclass(slots=True, frozen=True)
+class EventRecord:
+    id: str
+    type: str
+    repo: str
+    day: str
+    action: str = ""
+    title: str = ""
+    commits: tuple[CommitRecord, ...] = ()
+
+
+class Activity(NamedTuple):
+    by_day: dict[str, list[str]]
+    duplicates: int
+
+
+def first_line(message: str) -> str:
+    return message.split("\n", 1)[0]
+
+
+def parse_commit(repo: str, commit: dict) -> CommitRecord | None:
+    date_str = commit.get("commit", {}).get("author", {}).get("date", "")
+    if not commit.get("sha") or not date_str:
+        return None
+    message = first_line(commit.get("commit", {}).get("message", ""))
+    return CommitRecord(commit["sha"], repo, date_str.split("T")[0], message)
+
+
+def parse_event(event: dict) -> EventRecord | None:
+    event_type = event.get("type", "")
+    repo_name = event.get("repo", {}).get("name", "")
+    created_at = event.get("created_at", "")
+    payload = event.get("payload", {})
+
+    if not event.get("id") or not created_at:
+        return None
+
+    day = created_at.split("T")[0]
+    action = ""
+    title = ""
+    commits: tuple[CommitRecord, ...] = ()
+
+    if event_type == "PushEvent":
+        commits = tuple(
+            CommitRecord(commit.get("sha", ""), repo_name, day, first_line(commit.get("message", "")))
+            for commit in payload.get("commits", [])
+        )
+    elif event_type in ("PullRequestEvent", "PullRequestReviewEvent"):
+        action = payload.get("action", "")
+        title = payload.get("pull_request", {}).get("title", "")
+    elif event_type in ("IssueCommentEvent", "IssuesEvent"):
+        action = payload.get("action", "")
+        title = payload.get("issue", {}).get("title", "")
+    elif event_type == "CreateEvent":
+        action = payload.get("ref_type", "")
+        title = payload.get("ref") or ""
+
+    return EventRecord(str(event["id"]), event_type, repo_name, day, action, title, commits)
+
+
+def describe_commit(commit: CommitRecord) -> str:
+    return f"[{commit.repo}] Pushed: {commit.message}"
+
+
+def describe_event(event: EventRecord) -> list[str]:
+    repo_name = event.repo
+
+    if event.type == "PushEvent":
+        return [describe_commit(commit) for commit in event.commits]
+    if event.type == "PullRequestEvent":
+        return [f"[{repo_name}] PR {event.action}: {event.title}"]
+    if event.type == "PullRequestReviewEvent":
+        return [f"[{repo_name}] Reviewed PR: {event.title}"]
+    if event.type == "IssueCommentEvent":
+        return [f"[{repo_name}] Commented on: {event.title}"]
+    if event.type == "IssuesEvent":
+        return [f"[{repo_name}] Issue {event.action}: {event.title}"]
+    if event.type == "CreateEvent" and event.title:
+        return [f"[{repo_name}] Created {event.action}: {event.title}"]
+    return []
+
+
+def dedupe_commits(commits: Iterable[CommitRecord]) -> tuple[list[CommitRecord], int]:
+    # the same commit arrives from the org listing and from push events; cherry-picks and rebases
+    # get new SHAs but keep their message, so those collapse per repo and day
+    seen_shas: set[str] = set()
+    seen_messages: set[tuple[str, str, str]] = set()
+    unique: list[CommitRecord] = []
+    duplicates = 0
+    for commit in commits:
+        message_key = (commit.day, commit.repo, " ".join(commit.message.lower().split()))
+        if (commit.sha and commit.sha in seen_shas) or message_key in seen_messages:
+            duplicates += 1
+        else:
+            unique.append(commit)
+            seen_messages.add(message_key)
+        if commit.sha:
+            seen_shas.add(commit.sha)
+    return unique, duplicates
+
+
+def group_activity(commits: Iterable[CommitRecord], events: Iterable[EventRecord]) -> Activity:
+    # listed commits come first so their author dates win over push dates
+    events = list(events)
+    pushed = (commit for event in events for commit in event.commits)
+    unique, duplicates = dedupe_commits([*commits, *pushed])
+
+    by_day: dict[str, list[str]] = defaultdict(list)
+    for commit in unique:
+        by_day[commit.day].append(describe_commit(commit))
+    for event in events:
+        if event.type != "PushEvent":
+            by_day[event.day].extend(describe_event(event))
+    return Activity(dict(by_day), duplicates)
@@ -1,30 +1,42 @@
+import json
+import os
 import subprocess
 from pathlib import Path
+from typing import Literal
 
-import keyring
-import yaml
 from pydantic import BaseModel, SecretStr
 
-APP_NAME = "gus"
-CONFIG_DIR = Path.home() / ".config" / APP_NAME
-CONFIG_FILE = CONFIG_DIR / "config.yaml"
-CACHE_DIR = CONFIG_DIR / "cache"
-DATA_DIR = CONFIG_DIR / "data"
-LOG_DIR = CONFIG_DIR / "logs"
+from gustav import agent
+from gustav.paths import APP_NAME, CONFIG_FILE, SETTINGS_SNAPSHOT_FILE
 
 KEYRING_ANTHROPIC_KEY = "ANTHROPIC_API_KEY"
 KEYRING_GITHUB_TOKEN = "GITHUB_TOKEN"
 
+GIT_CONFIG_KEYS = {"user_email": "user.email", "user_name": "user.name"}
 
-def get_git_config(key: str) -> str | None:
+
+def get_git_configs(*keys: str) -> dict[str, str]:
+    pattern = "^(" + "|".join(key.replace(".", r"\.") for key in keys) + ")$"
     result = subprocess.run(
-        ["git", "config", "--global", key],
+        ["git", "config", "--global", "--get-regexp", pattern],
         capture_output=True,
         text=True,
     )
     if result.returncode != 0:
-        return None
-    return result.stdout.strip() or None
+        return {}
+    values: dict[str, str] = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        if value.strip():
+            values.setdefault(key, value.strip())
+    return values
+
+
+class Route(BaseModel):
+    # unset fields fall back to the anthropic settings and the max_tokens of the call
+    model: str | None = None
+    max_tokens: int | None = None
+    timeout: int | None = None
 
 
 class AnthropicSettings(BaseModel):
@@ -33,6 +45,11 @@ class AnthropicSettings(BaseModel):
     api_version: str = "2023-06-01"
     model: str = "claude-sonnet-4-20250514"
     timeout: int = 30
+    # prompt name -> route; prompts without one use the settings above
+    routes: dict[str, Route] = {}
+
+    def get_route(self, prompt_name: str) -> Route:
+        return self.routes.get(prompt_name) or Route()
 
 
 class GitHubSettings(BaseModel):
@@ -46,39 +63,154 @@ class GitSettings(BaseModel):
     user_name: str | None = None
 
 
+class DiffSettings(BaseModel):
+    context_lines: int = 3
+    ignore_space_change: bool = False
+    collapse_renames: bool = True
+    summarize_mechanical: bool = True
+    # files whose hunks are left out of prompts; they stay in the diff stat
+    ignore: list[str] = [
+        "package-lock.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "poetry.lock",
+        "uv.lock",
+        "Cargo.lock",
+        "Gemfile.lock",
+        "composer.lock",
+        "go.sum",
+    ]
+
+
+class FilesSettings(BaseModel):
+    # larger files are listed in prompts without their content
+    max_file_size: int = 100 * 1024
+    # files with more added plus deleted lines are left out of the diff
+    max_diff_lines: int = 2_000
+    # linguist-generated files are left out of both unless this is set
+    include_generated: bool = False
+    # "outline" sends large files as signatures plus the code around the changes, "full" sends them whole
+    commit_content: Literal["full", "outline"] = "outline"
+    pr_content: Literal["full", "outline"] = "outline"
+    # a large file version sent once is sent as its signatures afterwards; 0 disables the cache
+    summary_cache_mb: int = 32
+
+
+class CommitSettings(BaseModel):
+    # alternative messages generated alongside the first one, each in another style (up to four)
+    alternatives: int = 0
+
+
 class Settings(BaseModel):
     anthropic: AnthropicSettings
     github: GitHubSettings
     git: GitSettings = GitSettings()
+    diff: DiffSettings = DiffSettings()
+    files: FilesSettings = FilesSettings()
+    commit: CommitSettings = CommitSettings()
+
+
+def git_config_sources() -> list[Path]:
+    if os.environ.get("GIT_CONFIG_GLOBAL"):
+        return [Path(os.environ["GIT_CONFIG_GLOBAL"])]
+    xdg_config = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config")
+    return [Path.home() / ".gitconfig", xdg_config / "git" / "config"]
+
+
+def get_sources_fingerprint() -> dict[str, int | None]:
+    fingerprint: dict[str, int | None] = {}
+    for path in [CONFIG_FILE, *git_config_sources()]:
+        try:
+            fingerprint[str(path)] = path.stat().st_mtime_ns
+        except OSError:
+            fingerprint[str(path)] = None
+    return fingerprint
+
+
+def resolve_config() -> dict:
+    import yaml
+
+    with open(CONFIG_FILE) as f:
+        data = yaml.safe_load(f) or {}
+
+    git_data = data.get("git") or {}
+    missing = {field: key for field, key in GIT_CONFIG_KEYS.items() if field not in git_data}
+    if missing:
+        git_config = get_git_configs(*missing.values())
+        for field, key in missing.items():
+            git_data[field] = git_config.get(key)
+
+    return {
+        "anthropic": data.get("anthropic") or {},
+        "github": data.get("github") or {},
+        "git": git_data,
+        "diff": data.get("diff") or {},
+        "files": data.get("files") or {},
+        "commit": data.get("commit") or {},
+    }
+
+
+def load_resolved_config(fingerprint: dict[str, int | None]) -> dict:
+    try:
+        snapshot = json.loads(SETTINGS_SNAPSHOT_FILE.read_text())
+        if snapshot["sources"] == fingerprint:
+            return snapshot["config"]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+
+    config = resolve_config()
+    SETTINGS_SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    SETTINGS_SNAPSHOT_FILE.write_text(json.dumps({"sources": fingerprint, "config": config}))
+    return config
+
+
+def get_secret(name: str) -> str | None:
+    answered, secret = agent.get_secret(name)
+    if answered:
+        return secret
+    import keyring
+
+    return keyring.get_password(APP_NAME, name)
+
+
+# settings resolved earlier in this process, keyed by the source fingerprint they were built from
+_loaded: tuple[dict[str, int | None], Settings] | None = None
+
+
+def forget_loaded_settings() -> None:
+    global _loaded
+    _loaded = None
 
 
 def load_settings() -> Settings:
+    global _loaded
     if not config_exist():
         raise FileNotFoundError(f"Config file not found at {CONFIG_FILE}. Run 'gus init' first.")
 
-    with open(CONFIG_FILE) as f:
-        data = yaml.safe_load(f) or {}
+    fingerprint = get_sources_fingerprint()
+    if _loaded and _loaded[0] == fingerprint:
+        return _loaded[1]
+
+    config = load_resolved_config(fingerprint)
 
-    anthropic_api_key = keyring.get_password(APP_NAME, KEYRING_ANTHROPIC_KEY)
+    anthropic_api_key = get_secret(KEYRING_ANTHROPIC_KEY)
     if not anthropic_api_key:
         raise ValueError("Anthropic API key not found in keychain. Run 'gus init' first.")
 
-    github_token = keyring.get_password(APP_NAME, KEYRING_GITHUB_TOKEN)
+    github_token = get_secret(KEYRING_GITHUB_TOKEN)
     if not github_token:
         raise ValueError("GitHub token not found in keychain. Run 'gus init' first.")
 
-    anthropic_data = data.get("anthropic") or {}
-    github_data = data.get("github") or {}
-    git_data = data.get("git") or {}
-
-    git_data.setdefault("user_email", get_git_config("user.email"))
-    git_data.setdefault("user_name", get_git_config("user.name"))
-
-    return Settings(
-        anthropic=AnthropicSettings(api_key=SecretStr(anthropic_api_key), **anthropic_data),
-        github=GitHubSettings(token=SecretStr(github_token), **github_data),
-        git=GitSettings(**git_data),
+    settings = Settings(
+        anthropic=AnthropicSettings(api_key=SecretStr(anthropic_api_key), **config["anthropic"]),
+        github=GitHubSettings(token=SecretStr(github_token), **config["github"]),
+        git=GitSettings(**config["git"]),
+        diff=DiffSettings(**config.get("diff", {})),
+        files=FilesSettings(**config.get("files", {})),
+        commit=CommitSettings(**config.get("commit", {})),
     )
+    _loaded = (fingerprint, settings)
+    return settings
 
 
 def config_exist() -> bool:
@@ -86,16 +218,33 @@ def config_exist() -> bool:
 
 
 def anthropic_key_exists() -> bool:
+    import keyring
+
     return keyring.get_password(APP_NAME, KEYRING_ANTHROPIC_KEY) is not None
 
 
 def github_token_exists() -> bool:
+    import keyring
+
     return keyring.get_password(APP_NAME, KEYRING_GITHUB_TOKEN) is not None
 
 
+def notify_secrets_changed() -> None:
+    from gustav import daemon
+
+    agent.forget_secrets()
+    daemon.reload_daemon()
+
+
 def save_anthropic_key(api_key: str) -> None:
+    import keyring
+
     keyring.set_password(APP_NAME, KEYRING_ANTHROPIC_KEY, api_key)
+    notify_secrets_changed()
 
 
 def save_github_token(token: str) -> None:
+    import keyring
+
     keyring.set_password(APP_NAME, KEYRING_GITHUB_TOKEN, token)
+    notify_secrets_changed()
@@ -0,0 +1,125 @@
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+Attributes = dict[str, str | int | float | bool]
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: int
+    parent_id: int | None
+    thread_id: int
+    start_ns: int
+    end_ns: int = 0
+    attributes: Attributes = field(default_factory=dict)
+
+
+# None while tracing is off, so an untraced run only pays for the check in span()
+_spans: list[Span] | None = None
+_root: Span | None = None
+_current: ContextVar[int | None] = ContextVar("current_span", default=None)
+_ids = itertools.count(1)
+
+
+def start_tracing(name: str) -> None:
+    global _spans, _root
+    _spans = []
+    _root = Span(name, next(_ids), None, threading.get_ident(), time.time_ns())
+    _current.set(_root.span_id)
+
+
+@contextmanager
+def span(name: str, **attributes: str | int | float | bool) -> Iterator[Attributes]:
+    if _spans is None:
+        yield attributes
+        return
+
+    record = Span(name, next(_ids), _current.get(), threading.get_ident(), time.time_ns(), attributes=attributes)
+    token = _current.set(record.span_id)
+    try:
+        yield record.attributes
+    except BaseException as e:
+        record.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        record.end_ns = time.time_ns()
+        _current.reset(token)
+        _spans.append(record)
+
+
+def stop_tracing() -> list[Span]:
+    global _spans, _root
+    spans = _spans or []
+    if _root:
+        _root.end_ns = time.time_ns()
+        spans = [_root, *spans]
+    _spans = None
+    _root = None
+    _current.set(None)
+    return spans
+
+
+def to_chrome_trace(spans: list[Span]) -> dict:
+    pid = os.getpid()
+    events = [
+        {
+            "name": s.name,
+            "cat": "gus",
+            "ph": "X",
+            "ts": s.start_ns / 1000,
+            "dur": (s.end_ns - s.start_ns) / 1000,
+            "pid": pid,
+            "tid": s.thread_id,
+            "args": s.attributes,
+        }
+        for s in spans
+    ]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def to_otel_value(value: str | int | float | bool) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otel_trace(spans: list[Span]) -> dict:
+    # OTLP/JSON, as accepted by the collector's otlpjsonfile receiver
+    trace_id = secrets.token_hex(16)
+    otel_spans = [
+        {
+            "traceId": trace_id,
+            "spanId": f"{s.span_id:016x}",
+            "parentSpanId": f"{s.parent_id:016x}" if s.parent_id else "",
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": key, "value": to_otel_value(value)} for key, value in s.attributes.items()],
+        }
+        for s in spans
+    ]
+    resource = {"attributes": [{"key": "service.name", "value": {"stringValue": "gus"}}]}
+    return {
+        "resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": {"name": "gustav"}, "spans": otel_spans}]}]
+    }
+
+
+def write_trace(path: Path, trace_format: str) -> None:
+    spans = stop_tracing()
+    trace = to_otel_trace(spans) if trace_format == "otel" else to_chrome_trace(spans)
+    path.write_text(json.dumps(trace))
@@ -0,0 +1,86 @@
+import sqlite3
+from contextlib import closing
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from pathlib import Path
+
+from loguru import logger
+
+from gustav.paths import DATA_DIR
+
+USAGE_DB = DATA_DIR / "usage.db"
+GROUP_COLUMNS = {"day": "day", "command": "command", "prompt": "prompt", "model": "model", "repo": "repo"}
+TOKEN_FIELDS = ["input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    command TEXT,
+    repo TEXT,
+    prompt TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_creation_input_tokens INTEGER NOT NULL,
+    cache_read_input_tokens INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_day ON requests (day);
+"""
+
+# the command is per process (per request in the daemon); the repo is per thread, since gus pr --all works on many
+_command: str | None = None
+_repo: ContextVar[str | None] = ContextVar("usage_repo", default=None)
+
+
+def set_command(command: str | None) -> None:
+    global _command
+    _command = command
+
+
+def set_repo(repo: str | None) -> None:
+    _repo.set(repo)
+
+
+def connect(path: Path = USAGE_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_usage(prompt_name: str, model: str, usage: dict, latency: float) -> None:
+    now = datetime.now(UTC)
+    row = (
+        now.isoformat(timespec="seconds"),
+        now.astimezone().strftime("%Y-%m-%d"),
+        _command,
+        _repo.get(),
+        prompt_name,
+        model,
+        *(int(usage.get(field) or 0) for field in TOKEN_FIELDS),
+        round(latency * 1000),
+    )
+    try:
+        with closing(connect()) as conn, conn:
+            conn.execute("INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+    except sqlite3.Error as e:
+        logger.debug(f"Could not record usage: {e}")
+
+
+def summarize_usage(group_by: str, since_day: str) -> list[dict]:
+    column = GROUP_COLUMNS[group_by]
+    if not USAGE_DB.exists():
+        return []
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT COALESCE({column}, '-'), COUNT(*), SUM(input_tokens), SUM(output_tokens),
+                   SUM(cache_creation_input_tokens), SUM(cache_read_input_tokens), AVG(latency_ms), SUM(latency_ms)
+            FROM requests WHERE day >= ? GROUP BY 1 ORDER BY {"1 DESC" if group_by == "day" else "3 DESC"}
+            """,
+            (since_day,),
+        ).fetchall()
+    keys = ["group", "requests", *TOKEN_FIELDS, "avg_latency_ms", "total_latency_ms"]
+    return [dict(zip(keys, row, strict=True)) for row in rows]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Measure `gus` startup cost per subcommand using `python -X importtime`.
+
+Usage:
+    python scripts/bench_startup.py [--repeat N] [--top N] [--json PATH]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT))
+
+from gustav.cli import LAZY_COMMANDS  # noqa: E402
+
+DISPATCH_SNIPPET = "import click; from gustav.cli import main; main.get_command(click.Context(main), {name!r})"
+HELP_TARGET = "--help"
+
+
+def run_importtime(code: str) -> tuple[float, dict[str, int]]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # top-level imports only, with their cumulative time in microseconds
+    modules: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not name[1:].startswith(" "):
+            modules[name.strip()] = int(cumulative_us)
+    return wall, modules
+
+
+def bench(target: str, repeat: int) -> dict:
+    if target == HELP_TARGET:
+        code = "from gustav.cli import main; main(['--help'])"
+    else:
+        code = DISPATCH_SNIPPET.format(name=target)
+
+    walls: list[float] = []
+    imports: list[int] = []
+    modules: dict[str, int] = {}
+    for _ in range(repeat):
+        try:
+            wall, modules = run_importtime(code)
+        except RuntimeError as e:
+            return {"target": target, "error": str(e)}
+        walls.append(wall)
+        imports.append(sum(modules.values()))
+
+    return {
+        "target": target,
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "import_ms": round(statistics.median(imports) / 1000, 1),
+        "heaviest": sorted(modules.items(), key=lambda item: item[1], reverse=True),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark gus startup per subcommand")
+    parser.add_argument("--repeat", "-r", type=int, default=5, help="Runs per subcommand (default: 5)")
+    parser.add_argument("--top", "-t", type=int, default=3, help="Heaviest imports to show (default: 3)")
+    parser.add_argument("--json", dest="json_path", type=Path, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    results = [bench(target, args.repeat) for target in [HELP_TARGET, *sorted(LAZY_COMMANDS)]]
+
+    print(f"{'target':<10} {'wall ms':>8} {'import ms':>10}  heaviest")
+    for result in results:
+        if "error" in result:
+            print(f"{result['target']:<10} error: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in result["heaviest"][: args.top])
+        print(f"{result['target']:<10} {result['wall_ms']:>8} {result['import_ms']:>10}  {heaviest}")
+
+    if args.json_path:
+        args.json_path.write_text(json.dumps(results, indent=2))
+        print(f"Results saved to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
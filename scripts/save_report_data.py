@@ -6,7 +6,6 @@ Usage:
     python scripts/save_report_data.py [--days N]
 """
 import argparse
-import json
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -14,14 +13,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from gustav.clients.github import GitHubClient
-from gustav.settings import DATA_DIR, load_settings
-
-
-def save_raw_data(username: str, raw_data: dict) -> Path:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = DATA_DIR / f"report_{username}.json"
-    output_path.write_text(json.dumps(raw_data, indent=2))
-    return output_path
+from gustav.raw_data import RawDataWriter, get_raw_data_path
+from gustav.settings import load_settings
 
 
 def main() -> None:
@@ -37,10 +30,11 @@ def main() -> None:
 
     since = datetime.now() - timedelta(days=args.days)
     orgs = github.get_user_orgs()
-    _, raw_data = github.fetch_activity_by_day(username, orgs, since)
+    output_path = get_raw_data_path(username)
+    with RawDataWriter(output_path) as raw_writer:
+        github.fetch_activity_by_day(username, orgs, since, raw_writer)
 
-    output_path = save_raw_data(username, raw_data)
-    print(f"Raw data saved to {output_path}")
+    print(f"Saved {raw_writer.count} records to {output_path}")
 
 
 if __name__ == "__main__":